@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+""" Compare the throughput of the Markdown engines
+
+    Usage: python3 benchmarks/markdown_engines.py [page count]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from papier.md     import ENGINES
+from papier.walker import FSNode
+
+PAGE = '''# Page {index}
+
+Lorem ipsum dolor sit amet, *consectetur* adipiscing elit, **sed do** eiusmod.
+
+## Section
+
+* one
+* two
+* [three](three.md)
+
+```python
+def page_{index}():
+    return {index}
+```
+
+| key | value |
+| --- | ----- |
+| a   | {index} |
+'''
+
+
+def make_pages(base_path, count):
+    nodes = []
+
+    for index in range(count):
+        src_path = os.path.join(base_path, 'page-{}.md'.format(index))
+
+        with open(src_path, 'w') as f:
+            f.write(PAGE.format(index = index))
+
+        nodes.append(FSNode(src_path, src_path, os.path.basename(src_path), None, 'file'))
+
+    return nodes
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    with tempfile.TemporaryDirectory() as base_path:
+        nodes = make_pages(base_path, count)
+
+        for name, engine_class in sorted(ENGINES.items()):
+            try:
+                engine = engine_class()
+                engine.convert(nodes[0])
+            except Exception as e:
+                print('{:<16} skipped ({}: {})'.format(name, type(e).__name__, e))
+
+                continue
+
+            started_at = time.perf_counter()
+
+            for node in nodes:
+                engine.convert(node)
+
+            elapsed = time.perf_counter() - started_at
+
+            print('{:<16} {:>10.1f} pages/sec ({} pages in {:.3f}s)'.format(name, count / elapsed, count, elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+""" Measure the memory per node and the time to walk and build the doc tree
+
+    Usage: python3 benchmarks/node_model.py [file count] [fan-out]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from papier.doctree import Factory
+from papier.walker  import FileWalker
+
+
+def make_source_tree(base_path, count, fan_out):
+    """ Make empty pages in a balanced tree of directories """
+    directories = [base_path]
+    made        = 0
+
+    while made < count:
+        directory = directories.pop(0)
+
+        for index in range(fan_out):
+            if made >= count:
+                break
+
+            open(os.path.join(directory, 'page-{}.md'.format(index)), 'w').close()
+
+            sub_directory = os.path.join(directory, 'dir-{}'.format(index))
+
+            os.mkdir(sub_directory)
+            open(os.path.join(sub_directory, 'index.md'), 'w').close()
+
+            directories.append(sub_directory)
+
+            made += 2
+
+
+def main():
+    count   = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    fan_out = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    with tempfile.TemporaryDirectory() as base_path:
+        src_path = os.path.join(base_path, 'src')
+
+        os.mkdir(src_path)
+        make_source_tree(src_path, count, fan_out)
+
+        tracemalloc.start()
+
+        started_at = time.perf_counter()
+        nodes      = FileWalker().walk(src_path, os.path.join(base_path, 'build'))
+        walked_at  = time.perf_counter()
+        doc_tree   = Factory().make(nodes)
+        built_at   = time.perf_counter()
+
+        memory_usage, _ = tracemalloc.get_traced_memory()
+
+        tracemalloc.stop()
+
+        print('nodes          {:>12}'.format(len(nodes)))
+        print('walk           {:>12.3f}s'.format(walked_at - started_at))
+        print('build tree     {:>12.3f}s'.format(built_at - walked_at))
+        print('bytes per node {:>12.1f}'.format(memory_usage / len(nodes)))
+
+
+if __name__ == '__main__':
+    main()
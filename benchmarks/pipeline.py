@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+""" Time every stage of the build pipeline on a synthetic site
+
+    The site is generated by ``synthetic_site.py``, then built four ways:
+
+    * cold:    without the output and the caches of a previous build,
+    * warm:    again, with nothing changed,
+    * changed: again, after one source changed,
+    * update:  the same change applied by ``Assembler.update`` (watch mode).
+
+    Every stage recorded by the profiler of the assembler (see
+    ``papier.profiling``) is timed separately, together with the whole build
+    (``total``). As the pages are rendered while the sources are interpreted,
+    ``build`` includes the interpretation of a full build, while ``process``
+    only appears in the update, so the time spent interpreting the files
+    (``interpret``, every handler together) and rendering the pages
+    (``render``) is also reported on its own. With several jobs,
+    ``interpret`` adds up the time of every worker process. The median of the
+    repetitions is reported and can be saved as JSON and compared with the
+    results of another commit.
+
+    Usage: python3 benchmarks/pipeline.py [--pages 1000] [--json results.json] [--compare baseline.json]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from jinja2 import Environment, PackageLoader
+
+from papier.assembler   import Assembler
+from papier.assets      import AssetPipeline
+from papier.config      import BuildConfig, MainConfig, MarkdownConfig, OutputConfig, Parser, SearchConfig
+from papier.config      import SourceConfig, ThemeConfig
+from papier.content     import ContentStore
+from papier.doctree     import Factory
+from papier.interpreter import Interpreter
+from papier.md          import MarkDownHandler
+from papier.minify      import HTMLMinifier
+from papier.output      import OutputWriter
+from papier.profiling   import Profiler
+from papier.rendering   import RenderingEngine
+from papier.rst         import RSTHandler
+from papier.search      import SearchIndexer
+from papier.walker      import FileWalker
+
+from synthetic_site import SiteParameters, generate
+
+SCENARIOS = ('cold', 'warm', 'changed', 'update')
+STAGES    = (
+    'walk', 'process', 'make', 'publish', 'build', 'interpret', 'render', 'search', 'write', 'manifest', 'total',
+)
+
+
+def make_assembler():
+    output_writer = OutputWriter()
+
+    return Assembler(
+        Parser(),
+        FileWalker(ContentStore()),
+        Interpreter([RSTHandler(), MarkDownHandler()]),
+        Factory(),
+        RenderingEngine(Environment(loader = PackageLoader('papier', 'template'))),
+        output_writer,
+        AssetPipeline(output_writer),
+        HTMLMinifier(),
+        SearchIndexer(output_writer),
+    )
+
+
+def run_scenario(scenario, config, src_paths, assembler = None):
+    """ Build the site
+
+        :param assembler: the assembler of the previous build, ``None`` to build with a new one
+        :return: the timings and the assembler
+    """
+    assembler = assembler or make_assembler()
+    profiler  = Profiler()
+
+    assembler.use_profiler(profiler)
+
+    started_at = time.perf_counter()
+
+    if scenario == 'update':
+        assembler.update(config, src_paths)
+    else:
+        assembler.assemble(config)
+
+    timings              = {}
+    timings['total']     = time.perf_counter() - started_at
+    timings['interpret'] = 0.0
+
+    for name, stats in profiler.report()['stages'].items():
+        # One stage per handler, e.g. "interpret:MarkDownHandler"
+        if name.startswith('interpret:'):
+            timings['interpret'] += stats['wall']
+        else:
+            timings[name] = stats['wall']
+
+    return timings, assembler
+
+
+def change_source(src_path, revision):
+    with open(src_path, 'a') as f:
+        f.write('\nChanged in the revision {}.\n'.format(revision))
+
+
+def run(arguments):
+    parameters = SiteParameters(
+        pages      = arguments.pages,
+        depth      = arguments.depth,
+        fanout     = arguments.fanout,
+        rst_ratio  = arguments.rst_ratio,
+        paragraphs = arguments.paragraphs,
+        seed       = arguments.seed,
+    )
+    runs = {scenario: [] for scenario in SCENARIOS}
+
+    with tempfile.TemporaryDirectory() as base_path:
+        src_path    = os.path.join(base_path, 'src')
+        output_path = os.path.join(base_path, 'build')
+        src_paths   = generate(src_path, parameters)
+        config      = MainConfig(
+            SourceConfig(src_path),
+            OutputConfig(output_path),
+            ThemeConfig(),
+            [],
+            MarkdownConfig(arguments.markdown_engine),
+            BuildConfig(arguments.jobs),
+            SearchConfig(arguments.search),
+        )
+        changed_path = src_paths[len(src_paths) // 2]
+
+        for repetition in range(arguments.repeat):
+            shutil.rmtree(output_path, ignore_errors = True)
+            shutil.rmtree(os.path.join(src_path, '.papier-cache'), ignore_errors = True)
+
+            runs['cold'].append(run_scenario('cold', config, src_paths)[0])
+            runs['warm'].append(run_scenario('warm', config, src_paths)[0])
+
+            change_source(changed_path, '{}-a'.format(repetition))
+
+            timings, assembler = run_scenario('changed', config, src_paths)
+
+            runs['changed'].append(timings)
+
+            change_source(changed_path, '{}-b'.format(repetition))
+
+            # The update reuses the assembler of the previous build, as the watch mode does.
+            runs['update'].append(run_scenario('update', config, [changed_path], assembler)[0])
+
+    return {
+        'commit'   : get_commit(),
+        'python'   : platform.python_version(),
+        'platform' : platform.platform(),
+        'site'     : parameters.to_dict(),
+        'options'  : {
+            'markdown_engine' : arguments.markdown_engine,
+            'jobs'            : arguments.jobs,
+            'search'          : arguments.search,
+            'repeat'          : arguments.repeat,
+        },
+        'results'  : {
+            scenario: {
+                stage: statistics.median(timings.get(stage, 0) for timings in runs[scenario])
+                for stage in STAGES
+            }
+            for scenario in SCENARIOS
+        },
+    }
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd    = os.path.dirname(os.path.abspath(__file__)),
+            stderr = subprocess.DEVNULL,
+        ).decode('utf-8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(report, baseline = None):
+    print('{} pages, commit {}, Python {}'.format(report['site']['pages'], report['commit'], report['python']))
+    print('{:<10}'.format('') + ''.join('{:>12}'.format(stage) for stage in STAGES))
+
+    for scenario in SCENARIOS:
+        timings = report['results'][scenario]
+
+        print('{:<10}'.format(scenario) + ''.join('{:>11.3f}s'.format(timings[stage]) for stage in STAGES))
+
+        if not baseline:
+            continue
+
+        baseline_timings = baseline['results'].get(scenario, {})
+
+        print('{:<10}'.format('  vs base') + ''.join(
+            '{:>11.2f}x'.format(timings[stage] / baseline_timings[stage])
+            if baseline_timings.get(stage) else '{:>12}'.format('-')
+            for stage in STAGES
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Time every stage of the build pipeline on a synthetic site')
+
+    parser.add_argument('--pages', type = int, default = 1000, help = 'the number of pages')
+    parser.add_argument('--depth', type = int, default = 3, help = 'the depth of the directory tree')
+    parser.add_argument('--fanout', type = int, default = 4, help = 'the number of subdirectories per directory')
+    parser.add_argument('--rst-ratio', type = float, default = 0.3, help = 'the ratio of reStructuredText pages')
+    parser.add_argument('--paragraphs', type = int, default = 10, help = 'the number of paragraphs per page')
+    parser.add_argument('--seed', type = int, default = 1, help = 'the seed of the generated site')
+    parser.add_argument('--markdown-engine', default = 'python', help = 'the Markdown engine')
+    parser.add_argument('--jobs', type = int, default = 1, help = 'the number of interpreting processes')
+    parser.add_argument('--search', action = 'store_true', help = 'build the search index')
+    parser.add_argument('--repeat', type = int, default = 3, help = 'the number of repetitions')
+    parser.add_argument('--json', help = 'the path to save the results as JSON')
+    parser.add_argument('--compare', help = 'the path of the JSON results to compare with')
+
+    arguments = parser.parse_args()
+    report    = run(arguments)
+    baseline  = None
+
+    if arguments.compare:
+        with open(arguments.compare) as f:
+            baseline = json.load(f)
+
+    print_results(report, baseline)
+
+    if arguments.json:
+        with open(arguments.json, 'w') as f:
+            json.dump(report, f, indent = 4, sort_keys = True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+""" Compare the page rendering throughput before and after the rendering engine
+
+    The "per-page lookup" mode resolves the layout for every page and rewrites
+    the links by scanning the rendered HTML as ``Assembler.build_one`` used to
+    do while the "engine" mode uses the layouts compiled once per build.
+
+    Usage: python3 benchmarks/rendering.py [page count]
+"""
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from jinja2 import Environment, PackageLoader
+
+from papier.assets    import STATIC_DIRNAME
+from papier.config    import ThemeConfig
+from papier.doctree   import DocNode, Factory
+from papier.heading   import extract_title
+from papier.rendering import RenderingEngine
+from papier.walker    import FSNode
+
+BODY = '<p>See <a href="other.html">the other page</a>. {}</p>\n'.format('Lorem ipsum dolor sit amet. ' * 20) * 20
+
+_re_source_ext = re.compile('<a(?P<before> .+)? href="(?P<href>[^"]+)\.(?P<ext>md|rst)"(?P<after> .+)?>', re.I & re.M)
+
+
+def make_reference_paths(count):
+    """ Make the pages in ten sections, each section and the root having an index page """
+    yield 'index.html'
+
+    for index in range(count - 1):
+        yield 'section-{}/{}.html'.format(index % 10, 'index' if index < 10 else 'page-{}'.format(index))
+
+
+def make_nodes(base_path, count):
+    nodes = []
+
+    for index, reference_path in enumerate(make_reference_paths(count)):
+        cache_path     = os.path.join(base_path, str(index))
+        html           = '<h1>Page {}</h1>\n{}'.format(index, BODY)
+
+        with open(cache_path, 'w') as f:
+            f.write(html)
+
+        node       = FSNode(reference_path, reference_path, reference_path, cache_path, 'file')
+        node.title = extract_title(html)
+
+        nodes.append(node)
+
+    return nodes
+
+
+def iterate_pages(doc_tree):
+    for node in doc_tree.values():
+        if isinstance(node, DocNode):
+            yield node
+        else:
+            yield from iterate_pages(node)
+
+
+def main():
+    count        = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    templates    = Environment(loader = PackageLoader('papier', 'template'))
+    engine       = RenderingEngine(templates)
+    theme_config = ThemeConfig()
+
+    def render_per_page_lookup(node):
+        base_path = '../' * node.reference_path.count('/')
+        output    = templates.get_template('default.html').render(
+            page        = node,
+            contexts    = theme_config.contexts,
+            static_path = base_path + STATIC_DIRNAME,
+            root_path   = base_path,
+            asset       = lambda name: '{}{}/{}'.format(base_path, STATIC_DIRNAME, name),
+            search      = False,
+            highlight   = False,
+            prism       = True,
+        )
+
+        return _re_source_ext.sub('<a\g<before> href="\g<href>.html"\g<after>>', output)
+
+    with tempfile.TemporaryDirectory() as base_path:
+        doc_tree = Factory().make(make_nodes(base_path, count))
+
+        # Load the contents beforehand to only measure the rendering.
+        for node in iterate_pages(doc_tree):
+            node.content
+
+        for name, render in (
+            ('per-page lookup', render_per_page_lookup),
+            ('engine',          lambda node: engine.render(node, theme_config)),
+        ):
+            started_at = time.perf_counter()
+
+            for node in iterate_pages(doc_tree):
+                render(node)
+
+            elapsed = time.perf_counter() - started_at
+
+            print('{:<16} {:>10.1f} pages/sec ({} pages in {:.3f}s)'.format(name, count / elapsed, count, elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+""" Compare the per-document latency of the RST conversion
+
+    The "per-document setup" mode calls ``publish_parts`` with the settings
+    overrides as ``RSTService.to_html`` used to do while the "prepared" mode
+    uses the prepared pipeline of ``RSTService``.
+
+    Usage: python3 benchmarks/rst_pipeline.py [repetitions]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from docutils.core import publish_parts
+
+from papier.rst import RSTService, SETTINGS
+
+SECTION = '''Section {index}
+----------{underline}
+
+Lorem ipsum dolor sit amet, *consectetur* adipiscing elit, **sed do** eiusmod
+tempor incididunt ut labore et dolore magna aliqua. See `the guide <guide.rst>`_.
+
+* one
+* two
+
+.. code:: python
+
+   def section_{index}():
+       return {index}
+
+'''
+
+
+def make_document(section_count):
+    return 'Title\n=====\n\n' + ''.join(
+        SECTION.format(index = index, underline = '-' * len(str(index)))
+        for index in range(section_count)
+    )
+
+
+def measure(convert, text, repetitions):
+    started_at = time.perf_counter()
+
+    for _ in range(repetitions):
+        convert(text)
+
+    return (time.perf_counter() - started_at) / repetitions
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    service     = RSTService()
+
+    def convert_with_setup(text):
+        return publish_parts(text, writer = service.writer, settings_overrides = SETTINGS)['html_body']
+
+    for size_name, section_count in (('small', 1), ('medium', 20), ('large', 200)):
+        text = make_document(section_count)
+
+        for mode_name, convert in (
+            ('per-document setup', convert_with_setup),
+            ('prepared',           service.to_html),
+        ):
+            latency = measure(convert, text, max(1, repetitions // max(1, section_count // 20)))
+
+            print('{:<8} {:>8} bytes {:<20} {:>10.2f} ms/document'.format(size_name, len(text), mode_name, latency * 1000))
+
+
+if __name__ == '__main__':
+    main()
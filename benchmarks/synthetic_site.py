@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+""" Generate a synthetic source tree for the benchmarks
+
+    The pages are spread over a tree of directories, each directory having an
+    index page. The pages mix Markdown and reStructuredText, link to other
+    pages by their source names and contain code blocks. The same parameters
+    and seed always generate the same tree.
+
+    Usage: python3 benchmarks/synthetic_site.py <path> [page count] [depth] [fan-out] [RST ratio] [paragraphs]
+"""
+import os
+import random
+import sys
+
+WORDS = (
+    'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore et '
+    'dolore magna aliqua enim ad minim veniam quis nostrud exercitation ullamco laboris nisi aliquip ex ea '
+    'commodo consequat duis aute irure in reprehenderit voluptate velit esse cillum fugiat nulla pariatur'
+).split()
+
+CODE = '''def handle(request):
+    if request.path == '/':
+        return render('index.html', items = [item for item in range(10)])
+
+    return not_found()
+'''
+
+
+class SiteParameters(object):
+    def __init__(self, pages = 1000, depth = 3, fanout = 4, rst_ratio = 0.3, paragraphs = 10, seed = 1):
+        self.pages      = pages
+        self.depth      = depth
+        self.fanout     = fanout
+        self.rst_ratio  = rst_ratio
+        self.paragraphs = paragraphs
+        self.seed       = seed
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+
+def make_dir_paths(depth, fanout):
+    """ List the directories (relative to the source), breadth first """
+    dir_paths = ['']
+    level     = ['']
+
+    for _ in range(depth):
+        level = [
+            os.path.join(dir_path, 'section-{}'.format(index))
+            for dir_path in level
+            for index in range(fanout)
+        ]
+
+        dir_paths.extend(level)
+
+    return dir_paths
+
+
+def make_page_paths(parameters):
+    """ List the pages (relative to the source, without the extension), index pages first """
+    dir_paths  = make_dir_paths(parameters.depth, parameters.fanout)
+    page_paths = [os.path.join(dir_path, 'index') for dir_path in dir_paths][:parameters.pages]
+
+    for index in range(parameters.pages - len(page_paths)):
+        page_paths.append(os.path.join(dir_paths[index % len(dir_paths)], 'page-{}'.format(index)))
+
+    return page_paths
+
+
+def make_sentence(rng, word_count = 12):
+    return ' '.join(rng.choice(WORDS) for _ in range(word_count)).capitalize() + '.'
+
+
+def make_paragraph(rng):
+    return ' '.join(make_sentence(rng) for _ in range(rng.randint(3, 6)))
+
+
+def render_markdown(title, paragraphs, links):
+    lines = ['# {}'.format(title), '']
+
+    for index, paragraph in enumerate(paragraphs):
+        if index % 4 == 1:
+            lines.extend(['## {}'.format(paragraph.split('.')[0][:40]), ''])
+
+        lines.extend([paragraph, ''])
+
+        if index % 5 == 2:
+            lines.extend(['```python', CODE.rstrip(), '```', ''])
+
+    lines.extend('* [{}]({})'.format(label, href) for label, href in links)
+    lines.append('')
+
+    return '\n'.join(lines)
+
+
+def render_rst(title, paragraphs, links):
+    lines = [title, '=' * len(title), '']
+
+    for index, paragraph in enumerate(paragraphs):
+        if index % 4 == 1:
+            heading = paragraph.split('.')[0][:40]
+
+            lines.extend([heading, '-' * len(heading), ''])
+
+        lines.extend([paragraph, ''])
+
+        if index % 5 == 2:
+            lines.extend(['.. code-block:: python', ''])
+            lines.extend('    ' + line if line else '' for line in CODE.rstrip().split('\n'))
+            lines.append('')
+
+    lines.extend('* `{} <{}>`_'.format(label, href) for label, href in links)
+    lines.append('')
+
+    return '\n'.join(lines)
+
+
+def generate(path, parameters):
+    """ Generate the source tree
+
+        :return: the paths of the generated sources
+    """
+    rng        = random.Random(parameters.seed)
+    page_paths = make_page_paths(parameters)
+    extensions = {
+        page_path: '.rst' if rng.random() < parameters.rst_ratio else '.md'
+        for page_path in page_paths
+    }
+    src_paths  = []
+
+    for index, page_path in enumerate(page_paths):
+        extension  = extensions[page_path]
+        title      = 'Page {} {}'.format(index, rng.choice(WORDS).capitalize())
+        paragraphs = [make_paragraph(rng) for _ in range(parameters.paragraphs)]
+        links      = []
+
+        for other_path in rng.sample(page_paths, min(3, len(page_paths))):
+            href = os.path.relpath(other_path + extensions[other_path], os.path.dirname(page_path) or '.')
+
+            links.append((os.path.basename(other_path), href.replace(os.sep, '/')))
+
+        render   = render_rst if extension == '.rst' else render_markdown
+        src_path = os.path.join(path, page_path + extension)
+
+        os.makedirs(os.path.dirname(src_path), exist_ok = True)
+
+        with open(src_path, 'w') as f:
+            f.write(render(title, paragraphs, links))
+
+        src_paths.append(src_path)
+
+    return src_paths
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+
+        return
+
+    arguments  = sys.argv[2:]
+    parameters = SiteParameters(*[
+        cast(argument)
+        for cast, argument in zip((int, int, int, float, int), arguments)
+    ])
+
+    src_paths = generate(sys.argv[1], parameters)
+
+    print('Generated {} pages in {}'.format(len(src_paths), sys.argv[1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+""" Compare the theme configuration lookup with the former linear scan
+
+    Usage: python3 benchmarks/theme_lookup.py [page count] [override count]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from papier.config import MainConfig, OutputConfig, PathConfig, SourceConfig, ThemeConfig
+
+
+def get_theme_config_linearly(config, path):
+    """ The former lookup: one regex per override and one allocation per match """
+    for path_config in config.override:
+        if path_config.can_handle(path):
+            return ThemeConfig(
+                path     = path_config.theme_path   or config.theme.path,
+                layout   = path_config.theme_layout or config.theme.layout,
+                contexts = config.theme.contexts,
+            )
+
+    return config.theme
+
+
+def main():
+    page_count     = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    override_count = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+
+    overrides = [
+        PathConfig('section-{}/.*'.format(index), theme_layout = 'layout-{}'.format(index))
+        for index in range(override_count)
+    ]
+    paths = [
+        'section-{}/page-{}.html'.format(index % (override_count * 2), index)
+        for index in range(page_count)
+    ]
+
+    for name, get_theme_config in (
+        ('linear scan', get_theme_config_linearly),
+        ('indexed',     lambda config, path: config.get_theme_config(path)),
+    ):
+        config     = MainConfig(SourceConfig(), OutputConfig(), ThemeConfig(), overrides)
+        started_at = time.perf_counter()
+
+        for path in paths:
+            get_theme_config(config, path)
+
+        print('{:<12} {:>8} pages {:>6} overrides {:>10.3f}s'.format(name, page_count, override_count, time.perf_counter() - started_at))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+""" Compare the title lookups of every ancestor of every page on a synthetic tree
+
+    The "regex" lookup re-extracts the title from the cached HTML on every
+    access as ``DocNode.title`` used to do while the "cached" lookup reads the
+    title extracted once during the interpretation.
+
+    Usage: python3 benchmarks/title_lookup.py [node count] [fan-out]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from papier.doctree import DocNode, Factory
+from papier.heading import extract_outline, extract_title
+from papier.walker  import FSNode
+
+BODY = '<p>{}</p>\n'.format('Lorem ipsum dolor sit amet. ' * 40) * 20
+
+
+def make_reference_paths(count, fan_out):
+    """ Make a balanced tree where every directory has an index page """
+    paths       = []
+    directories = ['']
+
+    while len(paths) < count:
+        directory = directories.pop(0)
+
+        paths.append(os.path.join(directory, 'index.html'))
+
+        for index in range(fan_out):
+            if len(paths) >= count:
+                break
+
+            paths.append(os.path.join(directory, 'page-{}.html'.format(index)))
+            directories.append(os.path.join(directory, 'dir-{}'.format(index)))
+
+    return paths
+
+
+def make_nodes(base_path, count, fan_out):
+    nodes = []
+
+    for index, reference_path in enumerate(make_reference_paths(count, fan_out)):
+        cache_path = os.path.join(base_path, str(index))
+        html       = '<h1>{}</h1>\n{}'.format(reference_path, BODY)
+
+        with open(cache_path, 'w') as f:
+            f.write(html)
+
+        node         = FSNode(reference_path, reference_path, reference_path, cache_path, 'file')
+        node.title   = extract_title(html)
+        node.outline = extract_outline(html)
+
+        nodes.append(node)
+
+    return nodes
+
+
+def walk_ancestor_titles(doc_tree, get_title):
+    count = 0
+
+    for node in doc_tree.values():
+        if not isinstance(node, DocNode):
+            count += walk_ancestor_titles(node, get_title)
+
+            continue
+
+        for ancestor in node.ancestors:
+            if 'index' in ancestor:
+                get_title(ancestor['index'])
+
+            count += 1
+
+        get_title(node)
+
+    return count
+
+
+def main():
+    count   = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    fan_out = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    with tempfile.TemporaryDirectory() as base_path:
+        nodes    = make_nodes(base_path, count, fan_out)
+        doc_tree = Factory().make(nodes)
+
+        for name, get_title in (
+            ('regex',  lambda node: extract_title(node.fs_node.content)),
+            ('cached', lambda node: node.title),
+        ):
+            started_at = time.perf_counter()
+            lookups    = walk_ancestor_titles(doc_tree, get_title)
+            elapsed    = time.perf_counter() - started_at
+
+            print('{:<8} {:>8} nodes {:>8} ancestor lookups {:>10.3f}s'.format(name, count, lookups, elapsed))
+
+
+if __name__ == '__main__':
+    main()
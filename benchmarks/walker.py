@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+""" Compare the file walker with the former listdir-based walker
+
+    Usage: python3 benchmarks/walker.py [entry count] [fan-out]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from papier.walker import FileWalker, FSNode, hash_cache_name
+
+
+class ListDirFileWalker(object):
+    """ The former walker: listdir, two stats per entry and one sort per directory """
+    def walk(self, src_path, output_path, reference_path = None):
+        src_path    = os.path.abspath(src_path)
+        output_path = os.path.abspath(output_path)
+
+        reference_path  = reference_path or src_path
+        base_cache_path = os.path.join(reference_path, '.papier-cache')
+        ref_path_offset = len(reference_path) + 1
+        sub_paths       = []
+
+        for name in os.listdir(src_path):
+            if name[0] == '.':
+                continue
+
+            sub_src_path    = os.path.join(src_path, name)
+            sub_output_path = os.path.join(output_path, name)
+            sub_ref_path    = sub_src_path[ref_path_offset:]
+            sub_cache_path  = os.path.join(base_cache_path, hash_cache_name(sub_ref_path))
+
+            sub_paths.append(FSNode(
+                sub_src_path,
+                sub_output_path,
+                sub_ref_path,
+                sub_cache_path,
+                'dir' if os.path.isdir(sub_src_path) else 'file'
+            ))
+
+            if os.path.isdir(sub_src_path):
+                sub_paths.extend(self.walk(sub_src_path, sub_output_path, reference_path))
+
+        sub_paths.sort(key = lambda fs_node: fs_node.reference_path)
+
+        return sub_paths
+
+
+def make_source_tree(base_path, count, fan_out):
+    """ Make ``count`` entries in a balanced tree including a large excluded subtree """
+    directories = [base_path]
+    made        = 0
+
+    while made < count:
+        directory = directories.pop(0)
+
+        for index in range(fan_out):
+            if made >= count:
+                break
+
+            open(os.path.join(directory, 'page-{}.md'.format(index)), 'w').close()
+
+            sub_directory = os.path.join(directory, 'node_modules' if made == 2 else 'dir-{}'.format(index))
+
+            os.mkdir(sub_directory)
+            directories.append(sub_directory)
+
+            made += 2
+
+
+def measure(name, walk):
+    started_at = time.perf_counter()
+    nodes      = walk()
+    elapsed    = time.perf_counter() - started_at
+
+    print('{:<24} {:>8} nodes {:>10.3f}s'.format(name, len(nodes), elapsed))
+
+
+def main():
+    count   = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    fan_out = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    with tempfile.TemporaryDirectory() as base_path:
+        src_path    = os.path.join(base_path, 'src')
+        output_path = os.path.join(base_path, 'build')
+
+        os.mkdir(src_path)
+        make_source_tree(src_path, count, fan_out)
+
+        measure('listdir',             lambda: ListDirFileWalker().walk(src_path, output_path))
+        measure('scandir',             lambda: FileWalker().walk(src_path, output_path))
+        measure('scandir (excluding)', lambda: FileWalker().walk(src_path, output_path, exclude = ['node_modules']))
+
+
+if __name__ == '__main__':
+    main()
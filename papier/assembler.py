@@ -1,61 +1,461 @@
-import codecs
+import copy
+import json
+import logging
 import os
-import re
+import time
 
-from .doctree import DocNode
+from imagination.debug import get_logger
+
+from .dependency import DependencyRecorder
+from .doctree    import DocNode
+from .highlight  import STYLESHEET_FILENAME as HIGHLIGHT_STYLESHEET_FILENAME, get_stylesheet
+from .manifest   import BuildManifest, MANIFEST_FILENAME, digest_text
+from .profiling  import NULL_PROFILER
+from .scheduler  import RenderScheduler
+from .search     import STATE_FILENAME as SEARCH_STATE_FILENAME
+from .shard      import save_state as save_shard_state
+
+log = get_logger('assembler', level = logging.WARNING)
+
+
+def is_duplicate(fs_node, fs_nodes_by_key):
+    """ Tell whether another source already gives the page of the node, e.g. ``a.md`` and ``a.rst``
+
+        The first source wins. As the entries of a directory are walked in the
+        order of their names, it is the same source in every build (``a.md``).
+        The other sources are ignored with a warning.
+
+        :param fs_nodes_by_key: the nodes kept so far per reference path, updated with the node
+    """
+    kept_node = fs_nodes_by_key.setdefault(fs_node.reference_path, fs_node)
+
+    if kept_node is fs_node:
+        return False
+
+    log.warning('{} is ignored as {} already gives {}'.format(
+        fs_node.src_path,
+        kept_node.src_path,
+        fs_node.reference_path,
+    ))
+
+    return True
 
 
 class Assembler(object):
-    def __init__(self, config_parser, file_walker, interpreter, doctree_factory, templates):
-        self.config_parser   = config_parser
-        self.file_walker     = file_walker
-        self.interpreter     = interpreter
-        self.doctree_factory = doctree_factory
-        self.templates       = templates
+    def __init__(self, config_parser, file_walker, interpreter, doctree_factory, rendering_engine, output_writer,
+                 asset_pipeline, minifier, search_indexer):
+        self.config_parser    = config_parser
+        self.file_walker      = file_walker
+        self.interpreter      = interpreter
+        self.doctree_factory  = doctree_factory
+        self.rendering_engine = rendering_engine
+        self.output_writer    = output_writer
+        self.asset_pipeline   = asset_pipeline
+        self.minifier         = minifier
+        self.search_indexer   = search_indexer
+        self.profiler         = NULL_PROFILER
+
+        # The state of the last build, kept for the incremental updates.
+        self._nodes    = None
+        self._doc_tree = None
+        self._manifest = None
 
-        self._re_source_ext = re.compile('<a(?P<before> .+)? href="(?P<href>[^"]+)\.(?P<ext>md|rst)"(?P<after> .+)?>', re.I & re.M)
+    def use_profiler(self, profiler):
+        """ Record the time spent per stage with the profiler (see :mod:`papier.profiling`) """
+        self.profiler             = profiler
+        self.interpreter.profiler = profiler
 
     def assemble_by_file(self, configuration_file_path):
         return self.assemble(
             self.config_parser.parse_from_file(configuration_file_path)
         )
 
-    def assemble(self, config):
-        nodes = self.file_walker.walk(config.source.path, config.output.path)
+    def assemble(self, config, shard = None):
+        """ Build the site
+
+            The sources are sent to the interpretation as soon as the walk finds
+            them (see :class:`papier.interpreter.InterpretationBatch`) and every
+            page is rendered as soon as it and its navigation are interpreted
+            (see :class:`papier.scheduler.RenderScheduler`), so the first pages
+            are written while the others are still being interpreted.
+
+            With a shard (see :class:`papier.shard.Shard`), only the pages of
+            the shard are interpreted and rendered, into the output of the
+            shard. The index pages of the other shards are interpreted too for
+            the navigation, and any other page only when a page reads it.
+        """
+        profiler = self.profiler
+
+        site_fingerprint  = None
+        manifest_filename = MANIFEST_FILENAME
+
+        if shard:
+            site_fingerprint  = self._fingerprint(config)
+            manifest_filename = shard.get_cache_filename(MANIFEST_FILENAME)
+            config            = self._get_shard_config(config, shard)
+
+        with profiler.stage('manifest'):
+            manifest = BuildManifest.load(os.path.join(
+                os.path.abspath(config.source.path),
+                '.papier-cache',
+                manifest_filename,
+            ))
+
+            self.rendering_engine.reset()
+
+            manifest.use_fingerprint(self._fingerprint(config))
+
+        if config.build.content_budget:
+            self.file_walker.content_store.budget = config.build.content_budget
+
+        if config.output.writers:
+            self.output_writer.writers = config.output.writers
+
+        self.output_writer.hardlinks   = config.output.hardlinks
+        self.output_writer.compression = config.output.compression
+
+        self.minifier.enabled = config.output.minify
+        self.minifier.reset()
+
+        self.rendering_engine.configure(config)
+        self.interpreter.configure(config)
+
+        nodes         = []
+        nodes_by_key  = {}  # reference path -> node
+        owned_nodes   = []  # the nodes of the shard
+        pending_keys  = []  # the reference paths of the nodes being interpreted
+        foreign_nodes = {}  # reference path -> the page of another shard, not interpreted
+        documents     = None
+
+        try:
+            with self.interpreter.batch(config.build.jobs, manifest) as batch, self.output_writer:
+                with profiler.stage('walk'):
+                    for fs_node in self.file_walker.iterate(
+                        config.source.path,
+                        config.output.path,
+                        include = config.source.include,
+                        exclude = config.source.exclude,
+                    ):
+                        self.interpreter.prepare((fs_node,))
+
+                        if is_duplicate(fs_node, nodes_by_key):
+                            continue
+
+                        nodes.append(fs_node)
+
+                        is_owned = not shard or shard.owns(fs_node.reference_path)
+
+                        if is_owned:
+                            owned_nodes.append(fs_node)
+
+                        if is_owned or fs_node.is_index():
+                            if batch.add(fs_node):
+                                pending_keys.append(fs_node.reference_path)
+                        elif fs_node.is_file():
+                            manifest.record_presence(fs_node)
+
+                            if fs_node.interpreter:
+                                foreign_nodes[fs_node.reference_path] = fs_node
+
+                    nodes.sort(key = lambda fs_node: fs_node.reference_path)
+
+                with profiler.stage('make'):
+                    doc_tree = self.doctree_factory.make(nodes)
+
+                with profiler.stage('publish'):
+                    self.rendering_engine.use_assets(
+                        self.asset_pipeline.publish(config, owned_nodes, manifest, self._get_generated_assets(config))
+                    )
+
+                manifest.forget_unseen()
+
+                scheduler = RenderScheduler(nodes, pending_keys, manifest, foreign_nodes)
+                pages     = self._iter_pages(doc_tree)
+
+                if shard:
+                    pages = (node for node in pages if shard.owns(node.reference_path))
+
+                with profiler.stage('build'):
+                    self._build_pages(config, scheduler.start(pages), manifest, scheduler, batch, foreign_nodes)
+
+                    for fs_node in batch.results():
+                        self._build_pages(
+                            config,
+                            scheduler.settle(fs_node.reference_path),
+                            manifest,
+                            scheduler,
+                            batch,
+                            foreign_nodes,
+                        )
+
+                if config.search.enabled:
+                    with profiler.stage('search'):
+                        if shard:
+                            documents = self.search_indexer.collect(
+                                config,
+                                owned_nodes,
+                                manifest,
+                                shard.get_cache_filename(SEARCH_STATE_FILENAME),
+                            )
+                        else:
+                            self.search_indexer.build(config, nodes, manifest)
+
+                # The files still queued once every page is rendered.
+                with profiler.stage('write'):
+                    self.output_writer.flush()
+
+            self._remove_outputs(config, manifest)
+        finally:
+            with profiler.stage('manifest'):
+                manifest.record_output_stats()
+                manifest.save()
+
+        if shard:
+            save_shard_state(
+                shard,
+                config.output.path,
+                site_fingerprint,
+                {
+                    fs_node.reference_path: manifest.entries[fs_node.reference_path]
+                    for fs_node in owned_nodes
+                    if fs_node.reference_path in manifest.entries
+                },
+                documents,
+            )
+
+        self._nodes    = nodes
+        self._doc_tree = doc_tree
+        self._manifest = manifest
+
+        return doc_tree
+
+    def update(self, config, src_paths):
+        """ Rebuild the pages affected by the changed source paths
+
+            The nodes and the doc tree of the previous build are kept in memory.
+            A modified file is interpreted again while a created, deleted or
+            moved entry causes only its directory to be walked again. Then, only
+            the changed pages and the pages depending on them are rendered.
+
+            :param src_paths: the paths of the changed files and directories
+        """
+        if self._nodes is None:
+            return self.assemble(config)
+
+        src_root       = os.path.abspath(config.source.path)
+        manifest       = self._manifest
+        nodes_by_path  = {fs_node.src_path: fs_node for fs_node in self._nodes}
+        modified_nodes = []
+        dir_paths      = set()
+
+        for src_path in src_paths:
+            src_path = os.path.abspath(src_path)
+
+            if not src_path.startswith(src_root + os.sep):
+                continue
+
+            fs_node = nodes_by_path.get(src_path)
+
+            if fs_node and fs_node.is_file() and os.path.isfile(src_path):
+                modified_nodes.append(fs_node)
+
+                continue
+
+            dir_path = os.path.dirname(src_path)
+
+            # The directory may have been deleted too.
+            while dir_path != src_root and not os.path.isdir(dir_path):
+                dir_path = os.path.dirname(dir_path)
+
+            dir_paths.add(dir_path)
+
+        manifest.reset_changes()
+        self.minifier.reset()
+
+        profiler = self.profiler
+
+        try:
+            if dir_paths:
+                with profiler.stage('walk'):
+                    modified_nodes.extend(self._rewalk(config, dir_paths))
+
+            with profiler.stage('process'):
+                self.interpreter.process(modified_nodes, config.build.jobs, manifest)
+
+            if dir_paths:
+                with profiler.stage('make'):
+                    self._doc_tree = self.doctree_factory.make(self._nodes)
+
+            with self.output_writer:
+                with profiler.stage('publish'):
+                    self.asset_pipeline.publish_files(modified_nodes, manifest)
+
+                with profiler.stage('build'):
+                    self.build_many(config, self._doc_tree, manifest)
+
+                if config.search.enabled:
+                    with profiler.stage('search'):
+                        self.search_indexer.build(config, self._nodes, manifest)
+
+                with profiler.stage('write'):
+                    self.output_writer.flush()
+
+            self._remove_outputs(config, manifest)
+        finally:
+            with profiler.stage('manifest'):
+                manifest.record_output_stats()
+                manifest.save()
+
+        return self._doc_tree
+
+    def _rewalk(self, config, dir_paths):
+        """ Walk the directories again and replace their nodes
+
+            :return: the nodes found in the directories
+        """
+        src_root    = os.path.abspath(config.source.path)
+        output_root = os.path.abspath(config.output.path)
+        dir_paths   = sorted(dir_paths)
+
+        # Skip the directories inside another one being walked again.
+        dir_paths = [
+            dir_path
+            for dir_path in dir_paths
+            if not any(dir_path.startswith(other_path + os.sep) for other_path in dir_paths)
+        ]
+
+        found_nodes = []
+
+        for dir_path in dir_paths:
+            found_nodes.extend(self.file_walker.walk(
+                dir_path,
+                os.path.join(output_root, dir_path[len(src_root) + 1:]),
+                reference_path = src_root,
+                include        = config.source.include,
+                exclude        = config.source.exclude,
+            ))
+
+        self.interpreter.prepare(found_nodes)
 
-        self.interpreter.prepare(nodes)
-        self.interpreter.process(nodes)
+        found_nodes_by_key = {}
+        found_nodes        = [
+            fs_node
+            for fs_node in found_nodes
+            if not is_duplicate(fs_node, found_nodes_by_key)
+        ]
 
-        doc_tree = self.doctree_factory.make(nodes)
+        found_paths = {fs_node.reference_path for fs_node in found_nodes}
+        prefixes    = tuple(dir_path + os.sep for dir_path in dir_paths)
+        kept_nodes  = []
 
-        self.build_many(config, doc_tree)
+        for fs_node in self._nodes:
+            if not fs_node.src_path.startswith(prefixes):
+                kept_nodes.append(fs_node)
 
-    def build_many(self, config, doc_tree):
-        output_path  = config.output.path
-        theme_config = config.theme
+                continue
+
+            if fs_node.reference_path not in found_paths:
+                self._manifest.forget(fs_node.reference_path)
+
+            fs_node.release_content()
+
+        self._nodes = sorted(kept_nodes + found_nodes, key = lambda fs_node: fs_node.reference_path)
+
+        return found_nodes
+
+    def build_many(self, config, doc_tree, manifest = None):
+        for node in self._iter_pages(doc_tree):
+            if manifest and not manifest.needs_rendering(node.fs_node):
+                continue
+
+            self._build_page(config, node, manifest)
+
+    def _build_page(self, config, node, manifest = None, scheduler = None):
+        """ Render the page, queue it to the output writer and record it
+
+            The page is discarded if the scheduler postpones it.
+        """
+        theme_config = config.get_theme_config(node.path)
+
+        if self.profiler.enabled:
+            started_at     = time.perf_counter()
+            cpu_started_at = time.process_time()
+
+        with DependencyRecorder() as recorder:
+            output = self.rendering_engine.render(node, theme_config)
+
+        if self.profiler.enabled:
+            self.profiler.record(
+                'render',
+                time.perf_counter() - started_at,
+                time.process_time() - cpu_started_at,
+                node.reference_path,
+                started_at,
+            )
 
+        node.fs_node.release_content()
+
+        if scheduler and scheduler.postpone(node, recorder.dependencies):
+            return
+
+        output_digest = self.output_writer.write(node.output_path, self.minifier.minify(output))
+
+        if manifest:
+            manifest.record_rendering(node.fs_node, output_digest, recorder.dependencies)
+
+    def _build_pages(self, config, nodes, manifest, scheduler, batch, foreign_nodes):
+        for node in nodes:
+            self._build_page(config, node, manifest, scheduler)
+            self._interpret_requested(config, manifest, scheduler, batch, foreign_nodes)
+
+        self._interpret_requested(config, manifest, scheduler, batch, foreign_nodes)
+
+    def _interpret_requested(self, config, manifest, scheduler, batch, foreign_nodes):
+        """ Interpret the pages of the other shards which the pages of the shard depend on """
+        for reference_path in scheduler.pop_requested_keys():
+            if batch.add(foreign_nodes.pop(reference_path)):
+                continue
+
+            # Restored from a cache
+            self._build_pages(config, scheduler.settle(reference_path), manifest, scheduler, batch, foreign_nodes)
+
+    def _remove_outputs(self, config, manifest):
+        """ Remove the outputs of the deleted sources so that the output matches a clean build """
+        for reference_path in manifest.get_removed_paths():
+            self.output_writer.remove(os.path.join(config.output.path, reference_path), config.output.path)
+
+    def _iter_pages(self, doc_tree):
+        """ Yield the interpreted pages of the tree, depth first """
         for node in doc_tree.values():
             if not isinstance(node, DocNode):
-                self.build_many(config, node)
+                yield from self._iter_pages(node)
 
                 continue
 
-            theme_config = config.get_theme_config(node.path)
+            if node.interpreter:
+                yield node
 
-            self.build_one(node, doc_tree, output_path, theme_config)
+    def _get_generated_assets(self, config):
+        if not config.highlight.enabled:
+            return {}
 
-    def build_one(self, node, doc_tree, output_path, theme_config):
-        if node.is_dir():
-            return
+        return {HIGHLIGHT_STYLESHEET_FILENAME: get_stylesheet(config.highlight.style)}
 
-        dir_path = os.path.join(output_path, os.path.dirname(node.reference_path))
+    def _get_shard_config(self, config, shard):
+        """ Get the configuration building into the output of the shard """
+        shard_config        = copy.copy(config)
+        shard_config.output = copy.copy(config.output)
 
-        if not os.path.exists(dir_path):
-            os.makedirs(dir_path, 0o755)
+        shard_config.output.path = shard.get_output_path(config.output.path)
 
-        output = self.templates.get_template('default.html').render(page = node)
-        output = self._re_source_ext.sub('<a\g<before> href="\g<href>.html"\g<after>>', output)
+        return shard_config
 
-        #print(node.output_path)
-        with codecs.open(node.output_path, 'w') as f:
-            f.write(output)
+    def _fingerprint(self, config):
+        """ Digest the configuration and the templates """
+        return digest_text(json.dumps(
+            {
+                'config'    : config.fingerprint(),
+                'templates' : self.rendering_engine.template_digests(config),
+            },
+            sort_keys = True,
+        ))
@@ -0,0 +1,124 @@
+import json
+import os
+
+from .         import helper
+from .manifest import digest_file, digest_text
+
+STATIC_DIRNAME          = '_static'
+ASSET_MANIFEST_FILENAME = 'manifest.json'
+TEMPLATE_EXTENSIONS     = ('.html', '.scss', '.sass')
+
+
+class AssetPipeline(object):
+    """ Asset Pipeline
+
+        Publish the static files of the themes (e.g. ``default.css``) and the
+        source files which are not interpreted (e.g. images) with the output
+        writer, which only copies the files whose content changed.
+
+        The theme files are published in ``_static`` under content-hashed names
+        (e.g. ``_static/default.3f2a1b4c.css``) so that they can be served with
+        immutable cache headers. The files of the main theme are also published
+        under their own names for the themes using ``static_path`` and their
+        hashed names are listed in ``_static/manifest.json``.
+
+        :param output_writer: the output writer
+    """
+    def __init__(self, output_writer):
+        self.output_writer = output_writer
+
+    def publish(self, config, fs_nodes, manifest = None, generated = None):
+        """ Publish the theme and source assets
+
+            :param generated: the content of the generated static files per
+                              name (e.g. a stylesheet), published with the
+                              files of every theme
+            :return: the published paths (relative to the output path) of the
+                     assets per theme path and per name
+        """
+        self.publish_files(fs_nodes, manifest)
+
+        return self.publish_themes(config, generated)
+
+    def publish_files(self, fs_nodes, manifest = None):
+        """ Publish the source files which are not interpreted """
+        for fs_node in fs_nodes:
+            if fs_node.interpreter or not fs_node.is_file():
+                continue
+
+            if manifest and manifest.is_published(fs_node):
+                continue
+
+            digest = digest_file(fs_node.src_path)
+
+            self.output_writer.copy(fs_node.src_path, fs_node.output_path, digest)
+
+            if manifest:
+                manifest.record_publication(fs_node, digest)
+
+    def publish_themes(self, config, generated = None):
+        output_path = os.path.join(config.output.path, STATIC_DIRNAME)
+        theme_paths = {config.theme.path}
+        theme_paths.update(path_config.theme_path or config.theme.path for path_config in config.override)
+
+        assets = {}
+
+        for theme_path in theme_paths:
+            assets[theme_path] = {}
+
+            for name, src_path in self._list_theme_files(theme_path).items():
+                digest      = digest_file(src_path)
+                hashed_name = self._get_hashed_name(name, digest)
+
+                self.output_writer.copy(src_path, os.path.join(output_path, hashed_name), digest)
+
+                if theme_path == config.theme.path:
+                    self.output_writer.copy(src_path, os.path.join(output_path, name), digest)
+
+                assets[theme_path][name] = '{}/{}'.format(STATIC_DIRNAME, hashed_name)
+
+        for name, content in (generated or {}).items():
+            hashed_name = self._get_hashed_name(name, digest_text(content))
+
+            self.output_writer.write(os.path.join(output_path, hashed_name), content)
+            self.output_writer.write(os.path.join(output_path, name), content)
+
+            for theme_assets in assets.values():
+                theme_assets[name] = '{}/{}'.format(STATIC_DIRNAME, hashed_name)
+
+        self.output_writer.write(
+            os.path.join(output_path, ASSET_MANIFEST_FILENAME),
+            json.dumps(assets[config.theme.path], indent = 4, sort_keys = True),
+        )
+
+        return assets
+
+    def _list_theme_files(self, theme_path):
+        """ List the static files of the theme, falling back to the built-in theme
+
+            :return: the source paths per name
+        """
+        files = {}
+
+        for base_path in (helper.path('template'), theme_path):
+            if not base_path or not os.path.isdir(base_path):
+                continue
+
+            for dir_path, dir_names, file_names in os.walk(base_path):
+                dir_names[:] = [dir_name for dir_name in dir_names if not dir_name.startswith(('.', '_'))]
+
+                for file_name in file_names:
+                    if file_name.startswith(('.', '_')) or file_name.endswith(TEMPLATE_EXTENSIONS):
+                        continue
+
+                    src_path = os.path.join(dir_path, file_name)
+                    name     = os.path.relpath(src_path, base_path).replace(os.sep, '/')
+
+                    files[name] = src_path
+
+        return files
+
+    def _get_hashed_name(self, name, digest):
+        root, extension = os.path.splitext(name)
+
+        return '{}.{}{}'.format(root, digest[:8], extension)
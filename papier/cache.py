@@ -0,0 +1,201 @@
+import codecs
+import hashlib
+import os
+import threading
+import uuid
+
+
+class CacheBackendUnavailableError(RuntimeError):
+    """ Cache Backend Unavailable """
+
+
+def make_cache_key(source_digest, signature):
+    """ Make the key of an interpretation
+
+        The key only depends on the content of the source and on the handler
+        signature (its version and the settings affecting its output), so the
+        same page is shared across checkouts, branches and CI runners.
+    """
+    return hashlib.sha1('{}\0{}'.format(signature, source_digest).encode('utf-8')).hexdigest()
+
+
+class CacheStats(object):
+    def __init__(self):
+        self.hits          = 0
+        self.misses        = 0
+        self.writes        = 0
+        self.evictions     = 0
+        self.evicted_bytes = 0
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+
+class CacheBackend(object):
+    """ Interpretation Cache Backend
+
+        Keep the interpreted HTML by the key made with :func:`make_cache_key`.
+        A backend only has to be safe to share between concurrent builds.
+    """
+    def __init__(self):
+        self.stats = CacheStats()
+
+    def get(self, key):
+        """ Get the interpreted HTML, ``None`` if it is not cached """
+        raise NotImplementedError()
+
+    def put(self, key, content):
+        raise NotImplementedError()
+
+    def evict(self):
+        """ Remove the least recently used entries beyond the size limit """
+        pass
+
+
+class DirectoryCache(CacheBackend):
+    """ Cache backend storing the entries as files in a shared directory
+
+        The directory can be shared by several checkouts and builds at once
+        (e.g. an NFS mount or a CI cache volume). An entry is written to a
+        temporary file first and then renamed, so a build never reads a
+        partially written entry. The modification time of an entry is updated
+        on every hit so that the least recently used entries are evicted first
+        once the directory exceeds ``max_size``.
+
+        :param path:     the shared directory
+        :param max_size: the maximum number of bytes of the entries, ``None`` for no limit
+    """
+    extension = '.html'
+
+    def __init__(self, path, max_size = None):
+        super().__init__()
+
+        if not path:
+            raise CacheBackendUnavailableError('The path of the shared cache is not set.')
+
+        self.path     = os.path.abspath(path)
+        self.max_size = max_size
+        self._dirty   = False  # whether an entry was written since the last eviction
+        self._limit   = None  # the size limit enforced by the last eviction
+        self._lock    = threading.Lock()
+
+    def get(self, key):
+        path = self._get_path(key)
+
+        try:
+            with codecs.open(path, 'r', 'utf-8') as f:
+                content = f.read()
+        except FileNotFoundError:
+            self._count('misses')
+
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass  # evicted by another build in the meantime
+
+        self._count('hits')
+
+        return content
+
+    def put(self, key, content):
+        path     = self._get_path(key)
+        dir_path = os.path.dirname(path)
+
+        os.makedirs(dir_path, 0o755, exist_ok = True)
+
+        # Unique per writer as the directory is shared by the concurrent builds.
+        temp_path = os.path.join(dir_path, '.{}.{}.tmp'.format(key, uuid.uuid4().hex))
+
+        try:
+            with codecs.open(temp_path, 'w', 'utf-8') as f:
+                f.write(content)
+
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+            raise
+
+        self._dirty = True
+
+        self._count('writes')
+
+    def evict(self):
+        if not self.max_size:
+            return
+
+        # Once the limit is enforced, the size only grows with the writes of this build.
+        if self.max_size == self._limit and not self._dirty:
+            return
+
+        self._dirty = False
+        self._limit = self.max_size
+
+        if not os.path.isdir(self.path):
+            return
+
+        entries    = []  # (mtime, size, path)
+        total_size = 0
+
+        with os.scandir(self.path) as buckets:
+            for bucket in buckets:
+                if not bucket.is_dir():
+                    continue
+
+                with os.scandir(bucket.path) as files:
+                    for entry in files:
+                        if entry.name[0] == '.' or not entry.name.endswith(self.extension):
+                            continue
+
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError:
+                            continue
+
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+                        total_size += stat.st_size
+
+        if total_size <= self.max_size:
+            return
+
+        entries.sort()
+
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass  # evicted by another build
+
+            total_size -= size
+
+            self._count('evictions')
+            self._count('evicted_bytes', size)
+
+    def _get_path(self, key):
+        return os.path.join(self.path, key[:2], key + self.extension)
+
+    def _count(self, name, amount = 1):
+        with self._lock:
+            setattr(self.stats, name, getattr(self.stats, name) + amount)
+
+
+BACKENDS = {
+    'directory' : DirectoryCache,
+}
+
+
+def create_cache(cache_config):
+    """ Create the cache backend of the configuration, ``None`` if the shared cache is disabled """
+    if not cache_config.path:
+        return None
+
+    if cache_config.backend not in BACKENDS:
+        raise CacheBackendUnavailableError('Unknown cache backend: {}'.format(cache_config.backend))
+
+    return BACKENDS[cache_config.backend](cache_config.path, cache_config.max_size)
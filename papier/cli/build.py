@@ -1,8 +1,14 @@
+import cProfile
 import os
 import subprocess
+import sys
 
 from gallium import ICommand
 
+from ..interpreter import InterpretationError
+from ..profiling   import Profiler
+from ..shard       import InvalidShardError, Shard
+
 GH_MARKUP_INST_CLI = ['gem', 'install', '-q', 'github-markup', 'github-markdown', 'redcarpet']
 
 
@@ -32,6 +38,29 @@ class Build(ICommand):
             action   = 'store_true'
         )
 
+        parser.add_argument(
+            '--jobs',
+            '-j',
+            help     = 'the number of worker processes for the interpretation (default: papier.yml or 1)',
+            required = False,
+            type     = int,
+            default  = None
+        )
+
+        parser.add_argument(
+            '--cache',
+            help     = 'the shared directory of the interpretation cache (default: papier.yml or none)',
+            required = False,
+            default  = None
+        )
+
+        parser.add_argument(
+            '--shard',
+            help     = 'only build the shard i of N (e.g. 2/4) into <output>.shard-i-of-N, see "papier merge"',
+            required = False,
+            default  = None
+        )
+
         parser.add_argument(
             '--watch',
             '-w',
@@ -40,23 +69,123 @@ class Build(ICommand):
             action   = 'store_true'
         )
 
+        parser.add_argument(
+            '--profile',
+            help     = 'report the time spent per stage and the slowest files',
+            required = False,
+            action   = 'store_true'
+        )
+
+        parser.add_argument(
+            '--profile-json',
+            help     = 'the path to save the profiling report as JSON (implies --profile)',
+            required = False,
+            default  = None
+        )
+
+        parser.add_argument(
+            '--profile-trace',
+            help     = 'the path to save the trace of the build for chrome://tracing (implies --profile)',
+            required = False,
+            default  = None
+        )
+
+        parser.add_argument(
+            '--cprofile',
+            help     = 'the path to save the cProfile statistics of the build (for pstats or snakeviz)',
+            required = False,
+            default  = None
+        )
+
     def execute(self, args):
         observer = None
 
         if args.install_deps and not self._install_dependencies():
             return
 
+        shard = None
+
+        if args.shard:
+            try:
+                shard = Shard.parse(args.shard)
+            except InvalidShardError as e:
+                print('[build] {}'.format(e))
+
+                sys.exit(1)
+
+            if args.watch:
+                print('[build] A shard cannot be watched')
+
+                sys.exit(1)
+
         if args.watch:
             observer = self.core.get('papier.live_updater')
 
-        doc_tree = self.core.get('papier.assembler').assemble_by_file(args.config)
+        config = self.core.get('papier.config.parser').parse_from_file(args.config)
+
+        if args.jobs:
+            config.build.jobs = args.jobs
+
+        if args.cache:
+            config.cache.path = os.path.abspath(args.cache)
+
+        assembler = self.core.get('papier.assembler')
+        profiler  = None
+        cprofiler = cProfile.Profile() if args.cprofile else None
+
+        if args.profile or args.profile_json or args.profile_trace:
+            profiler = Profiler()
+
+            assembler.use_profiler(profiler)
+
+        try:
+            if cprofiler:
+                cprofiler.enable()
+
+            doc_tree = assembler.assemble(config, shard)
+        except InterpretationError as e:
+            for fs_node, error in e.failures:
+                print('[build] {}: {}: {}'.format(fs_node.reference_path, type(error).__name__, error))
+
+            print('[build] Failed to interpret {} file(s)'.format(len(e.failures)))
+
+            sys.exit(1)
+        finally:
+            if cprofiler:
+                cprofiler.disable()
+                cprofiler.dump_stats(args.cprofile)
+
+            if profiler:
+                self._report_profile(profiler, args)
+
+        if config.output.minify:
+            print('[build] Minification saved {} bytes'.format(assembler.minifier.saved_bytes))
+
+        if assembler.interpreter.shared_cache:
+            stats = assembler.interpreter.shared_cache.stats
+
+            print('[build] Shared cache: {} hit(s), {} miss(es), {} evicted ({} bytes)'.format(
+                stats.hits,
+                stats.misses,
+                stats.evictions,
+                stats.evicted_bytes,
+            ))
 
         if observer:
-            observer.watch(args.src)
+            observer.watch(config)
             observer.run_blocking_observation()
 
         print('[build] Complete without exciting incident')
 
+    def _report_profile(self, profiler, args):
+        print(profiler.format_report())
+
+        if args.profile_json:
+            profiler.write_json(args.profile_json)
+
+        if args.profile_trace:
+            profiler.write_trace(args.profile_trace)
+
     def _install_dependencies(self):
         try:
             subprocess.check_call('touch quick-test.md', shell = True)
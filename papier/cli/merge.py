@@ -0,0 +1,42 @@
+import os
+import sys
+
+from gallium import ICommand
+
+from ..shard import ShardMergeError
+
+
+class Merge(ICommand):
+    """ Merge the outputs of a sharded build """
+    def identifier(self):
+        return 'merge'
+
+    def define(self, parser):
+        parser.add_argument(
+            '--config',
+            '-c',
+            help     = 'the directory that contains the site configuration file',
+            required = False,
+            default  = os.path.join(os.getcwd(), 'papier.yml')
+        )
+
+        parser.add_argument(
+            '--shards',
+            '-n',
+            help     = 'the number of shards (N of "papier build --shard i/N")',
+            required = True,
+            type     = int
+        )
+
+    def execute(self, args):
+        config = self.core.get('papier.config.parser').parse_from_file(args.config)
+        merger = self.core.get('papier.shard.merger')
+
+        try:
+            merged_count = merger.merge(config, args.shards)
+        except ShardMergeError as e:
+            print('[merge] {}'.format(e))
+
+            sys.exit(1)
+
+        print('[merge] Merged {} file(s) from {} shard(s) into {}'.format(merged_count, args.shards, config.output.path))
@@ -0,0 +1,61 @@
+import asyncio
+import os
+
+from gallium import ICommand
+
+from ..preview import PreviewSite
+from ..server  import PreviewServer
+
+
+class Serve(ICommand):
+    """ Preview the site without writing it to the disk """
+    def identifier(self):
+        return 'serve'
+
+    def define(self, parser):
+        parser.add_argument(
+            '--config',
+            '-c',
+            help     = 'the directory that contains the site configuration file',
+            required = False,
+            default  = os.path.join(os.getcwd(), 'papier.yml')
+        )
+
+        parser.add_argument(
+            '--host',
+            help     = 'the host to listen on',
+            required = False,
+            default  = '127.0.0.1'
+        )
+
+        parser.add_argument(
+            '--port',
+            '-p',
+            help     = 'the port to listen on',
+            required = False,
+            type     = int,
+            default  = 8000
+        )
+
+    def execute(self, args):
+        config = self.core.get('papier.config.parser').parse_from_file(args.config)
+        site   = PreviewSite(self.core.get('papier.assembler'), config)
+        server = PreviewServer(site, args.host, args.port)
+
+        site.load()
+
+        observer = self.core.get('papier.live_updater')
+        observer.watch(config, lambda src_paths: server.notify(site.invalidate(src_paths)))
+        observer.start()
+
+        print('[serve] Serving on http://{}:{}/'.format(args.host, args.port))
+
+        try:
+            asyncio.run(server.serve_forever())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            observer.stop()
+            observer.join()
+
+        print('[serve] Stopped')
@@ -0,0 +1,51 @@
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.html', '.css', '.js')
+
+
+class CompressionFormatUnavailableError(RuntimeError):
+    """ Compression Format Unavailable """
+
+
+def compress_gzip(data):
+    # A fixed modification time keeps the output identical between builds.
+    return gzip.compress(data, compresslevel = 9, mtime = 0)
+
+
+def compress_brotli(data):
+    return brotli.compress(data, quality = 11)
+
+
+FORMATS = {
+    'gzip'   : ('.gz', compress_gzip),
+    'brotli' : ('.br', compress_brotli),
+}
+
+# The extensions of the pre-compressed siblings of every format
+COMPRESSED_EXTENSIONS = tuple(extension for extension, _ in FORMATS.values())
+
+
+def get_compressors(format_names):
+    """ Get the file extension and the compressing function of each format
+
+        The formats whose library is not installed (i.e. ``brotli``) are skipped.
+
+        :return: the list of ``(extension, compress)``
+    """
+    compressors = []
+
+    for format_name in format_names or ():
+        if format_name not in FORMATS:
+            raise CompressionFormatUnavailableError('Unknown compression format: {}'.format(format_name))
+
+        if format_name == 'brotli' and not brotli:
+            continue
+
+        compressors.append(FORMATS[format_name])
+
+    return compressors
@@ -5,25 +5,77 @@ import re
 
 import yaml
 
+_re_size = re.compile('^\s*(?P<number>\d+)\s*(?P<unit>[kmgt]?)i?b?\s*$', re.I)
+_size_units = {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3, 't': 1024 ** 4}
+
+
+def parse_size(size):
+    """ Parse the size in bytes, e.g. ``1048576``, ``"512K"``, ``"64MB"`` or ``"2GiB"``. """
+    if size is None or isinstance(size, int):
+        return size
+
+    matches = _re_size.search(size)
+
+    if not matches:
+        raise ValueError('Invalid size: {}'.format(size))
+
+    return int(matches.group('number')) * _size_units[matches.group('unit').lower()]
+
 
 class SourceConfig(object):
-    def __init__(self, path = None, index_filename = None):
+    def __init__(self, path = None, index_filename = None, include = None, exclude = None):
         self.path           = path           or 'src'
         self.index_filename = index_filename or 'index'
+        self.include        = include        or []
+        self.exclude        = exclude        or []
 
 
 class OutputConfig(object):
-    def __init__(self, path = None):
-        self.path = path or 'build'
+    def __init__(self, path = None, writers = None, hardlinks = True, compression = None, minify = False):
+        self.path        = path or 'build'
+        self.writers     = writers
+        self.hardlinks   = hardlinks
+        self.compression = compression or []
+        self.minify      = minify
 
 
 class ThemeConfig(object):
     def __init__(self, path = None, layout = None, contexts = None):
-        self.path     = path     or 'build'
+        self.path     = path  # None for the built-in theme
         self.layout   = layout   or 'default.html'
         self.contexts = contexts or {}
 
 
+class MarkdownConfig(object):
+    def __init__(self, engine = None):
+        self.engine = engine or 'github-markup'
+
+
+class BuildConfig(object):
+    def __init__(self, jobs = None, content_budget = None):
+        self.jobs           = jobs or 1
+        self.content_budget = parse_size(content_budget)
+
+
+class HighlightConfig(object):
+    def __init__(self, enabled = False, style = None, prism = None):
+        self.enabled = enabled
+        self.style   = style or 'default'
+        self.prism   = (not enabled) if prism is None else prism
+
+
+class SearchConfig(object):
+    def __init__(self, enabled = False):
+        self.enabled = enabled
+
+
+class CacheConfig(object):
+    def __init__(self, path = None, max_size = None, backend = None):
+        self.path     = path  # None to disable the shared cache
+        self.max_size = parse_size(max_size)
+        self.backend  = backend or 'directory'
+
+
 class PathConfig(object):
     def __init__(self, pattern, theme_path = None, theme_layout = None):
         self.pattern      = re.compile('^{}$'.format(pattern))
@@ -34,23 +86,137 @@ class PathConfig(object):
         return self.pattern.search(path)
 
 
+class OverrideMatcher(object):
+    """ Match the paths against the overrides with a prefix trie
+
+        :param path_configs: the overrides
+        :param theme:        the main theme configuration
+    """
+    _regex_chars = set('.^$*+?{}[]\\|()')
+    _quantifiers = set('*+?{')
+
+    def __init__(self, path_configs, theme):
+        self.path_configs  = path_configs
+        self.theme_configs = [
+            ThemeConfig(
+                path     = path_config.theme_path   or theme.path,
+                layout   = path_config.theme_layout or theme.layout,
+                contexts = theme.contexts,
+            )
+            for path_config in path_configs
+        ]
+
+        self._trie = {}  # character -> sub-trie, None -> the indexes of the overrides
+
+        for index, path_config in enumerate(path_configs):
+            trie = self._trie
+
+            for character in self._get_literal_prefix(path_config.pattern.pattern[1:-1]):
+                trie = trie.setdefault(character, {})
+
+            trie.setdefault(None, []).append(index)
+
+    def match(self, path):
+        candidates = list(self._trie.get(None, []))
+        trie       = self._trie
+
+        for character in path:
+            trie = trie.get(character)
+
+            if trie is None:
+                break
+
+            candidates.extend(trie.get(None, []))
+
+        for index in sorted(candidates):
+            if self.path_configs[index].can_handle(path):
+                return self.theme_configs[index]
+
+        return None
+
+    def _get_literal_prefix(self, pattern):
+        """ Get the characters which any matching path must start with """
+        if '|' in pattern:
+            return ''
+
+        prefix = []
+        cursor = 0
+
+        while cursor < len(pattern):
+            character = pattern[cursor]
+
+            if character == '\\':
+                if cursor + 1 >= len(pattern) or pattern[cursor + 1].isalnum():
+                    break
+
+                character = pattern[cursor + 1]
+                cursor   += 2
+            elif character in self._regex_chars:
+                break
+            else:
+                cursor += 1
+
+            # The character is optional or repeated.
+            if cursor < len(pattern) and pattern[cursor] in self._quantifiers:
+                break
+
+            prefix.append(character)
+
+        return ''.join(prefix)
+
+
 class MainConfig(object):
-    def __init__(self, source, output, theme, override):
-        self.source   = source
-        self.output   = output
-        self.theme    = theme
-        self.override = override
+    def __init__(self, source, output, theme, override, markdown = None, build = None, search = None,
+                 highlight = None, cache = None):
+        self.source    = source
+        self.output    = output
+        self.theme     = theme
+        self.override  = override
+        self.markdown  = markdown  or MarkdownConfig()
+        self.build     = build     or BuildConfig()
+        self.search    = search    or SearchConfig()
+        self.highlight = highlight or HighlightConfig()
+        self.cache     = cache     or CacheConfig()
+
+        self._override_matcher = None
+        self._theme_configs    = {}  # path -> ThemeConfig
+
+    def fingerprint(self):
+        """ Get the settings which affect the rendered output """
+        return {
+            'source'    : [self.source.include, self.source.exclude],
+            'output'    : [self.output.path, self.output.compression, self.output.minify],
+            'theme'     : [self.theme.path, self.theme.layout, self.theme.contexts],
+            'markdown'  : self.markdown.engine,
+            'search'    : self.search.enabled,
+            'highlight' : [self.highlight.enabled, self.highlight.style, self.highlight.prism],
+            'override'  : [
+                [path_config.pattern.pattern, path_config.theme_path, path_config.theme_layout]
+                for path_config in self.override
+            ],
+        }
 
     def get_theme_config(self, path):
-        for path_config in self.override:
-            if path_config.can_handle(path):
-                return ThemeConfig(
-                    path     = path_config.theme_path   or self.theme.path,
-                    layout   = path_config.theme_layout or self.theme.layout,
-                    contexts = self.theme.contexts,
-                )
+        """ Get the theme configuration of the path
+
+            The overrides are indexed by the literal prefixes of their patterns
+            so that only the overrides whose prefix matches the path are tried,
+            in their original order. The resolved configuration is memoized per
+            path and there is one theme configuration per override.
+        """
+        if path not in self._theme_configs:
+            self._theme_configs[path] = self._resolve_theme_config(path)
+
+        return self._theme_configs[path]
+
+    def _resolve_theme_config(self, path):
+        if not self.override:
+            return self.theme
 
-        return self.theme
+        if not self._override_matcher:
+            self._override_matcher = OverrideMatcher(self.override, self.theme)
+
+        return self._override_matcher.match(path) or self.theme
 
 
 class Parser(object):
@@ -74,10 +240,15 @@ class Parser(object):
         else:
             raise RuntimeError('Not support this type of configuration.')
 
-        source = SourceConfig()
-        output = OutputConfig()
-        theme  = ThemeConfig()
-        paths  = []
+        source    = SourceConfig()
+        output    = OutputConfig()
+        theme     = ThemeConfig()
+        markdown  = MarkdownConfig()
+        build     = BuildConfig()
+        search    = SearchConfig()
+        highlight = HighlightConfig()
+        cache     = CacheConfig()
+        paths     = []
 
         if 'source' in parsed_content:
             source = SourceConfig(**parsed_content['source'])
@@ -88,6 +259,21 @@ class Parser(object):
         if 'theme' in parsed_content and parsed_content['theme']:
             theme = ThemeConfig(**parsed_content['theme'])
 
+        if 'markdown' in parsed_content and parsed_content['markdown']:
+            markdown = MarkdownConfig(**parsed_content['markdown'])
+
+        if 'build' in parsed_content and parsed_content['build']:
+            build = BuildConfig(**parsed_content['build'])
+
+        if 'search' in parsed_content and parsed_content['search']:
+            search = SearchConfig(**parsed_content['search'])
+
+        if 'highlight' in parsed_content and parsed_content['highlight']:
+            highlight = HighlightConfig(**parsed_content['highlight'])
+
+        if 'cache' in parsed_content and parsed_content['cache']:
+            cache = CacheConfig(**parsed_content['cache'])
+
         if 'override' in parsed_content and parsed_content['override']:
             for pattern, theme_config in parsed_content['override'].items():
                 paths.append(PathConfig(pattern, **theme_config))
@@ -96,11 +282,12 @@ class Parser(object):
             source.path = self._fix_path(source.path, base_path)
             output.path = self._fix_path(output.path, base_path)
             theme.path  = self._fix_path(theme.path,  base_path)
+            cache.path  = self._fix_path(cache.path,  base_path)
 
             for path in paths:
                 path.theme_path = self._fix_path(path.theme_path, base_path)
 
-        return MainConfig(source, output, theme, paths)
+        return MainConfig(source, output, theme, paths, markdown, build, search, highlight, cache)
 
     def _fix_path(self, path, base_path):
         if not path:
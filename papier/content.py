@@ -0,0 +1,100 @@
+import mmap
+import os
+
+from collections import OrderedDict
+
+DEFAULT_BUDGET = 64 * 1024 * 1024
+
+
+class ContentStore(object):
+    """ Content Store
+
+        Keep the recently used interpreted HTML in memory up to a byte budget.
+        The least recently used bodies are released first and reloaded from
+        the interpretation cache on demand.
+
+        :param budget: the maximum number of bytes to keep in memory
+    """
+    def __init__(self, budget = None):
+        self.budget   = budget or DEFAULT_BUDGET
+        self._entries = OrderedDict()  # path -> (content, size)
+        self._size    = 0
+
+    @property
+    def size(self):
+        return self._size
+
+    def get(self, path):
+        if path in self._entries:
+            self._entries.move_to_end(path)
+
+            return self._entries[path][0]
+
+        content, size = self._load(path)
+
+        self._entries[path] = (content, size)
+        self._size         += size
+
+        self._evict()
+
+        return content
+
+    def release(self, path):
+        if path not in self._entries:
+            return
+
+        _, size = self._entries.pop(path)
+
+        self._size -= size
+
+    def clear(self):
+        self._entries.clear()
+
+        self._size = 0
+
+    def _evict(self):
+        # Always keep the most recently used entry.
+        while self._size > self.budget and len(self._entries) > 1:
+            _, (_, size) = self._entries.popitem(last = False)
+
+            self._size -= size
+
+    def _load(self, path):
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+
+            if not size:
+                return '', 0
+
+            with mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as mapped:
+                return mapped[:].decode('utf-8'), size
+
+
+class MemoryContentStore(ContentStore):
+    """ Content Store which also holds the contents which only exist in memory
+
+        The contents given to :meth:`put` are never evicted until released.
+    """
+    def __init__(self, budget = None):
+        super().__init__(budget)
+
+        self._pinned_entries = {}
+
+    def put(self, path, content):
+        self._pinned_entries[path] = content
+
+    def get(self, path):
+        if path in self._pinned_entries:
+            return self._pinned_entries[path]
+
+        return super().get(path)
+
+    def release(self, path):
+        self._pinned_entries.pop(path, None)
+
+        super().release(path)
+
+    def clear(self):
+        self._pinned_entries.clear()
+
+        super().clear()
@@ -0,0 +1,39 @@
+import threading
+
+_local = threading.local()
+
+
+class DependencyRecorder(object):
+    """ Record the nodes whose titles and paths are read while rendering a page
+
+        The dependencies are identified by the reference paths of the nodes,
+        where a directory is identified by its own reference path (or an empty
+        string for the root) as its title and kind depend on its index page.
+
+        .. code-block:: python
+
+            with DependencyRecorder() as recorder:
+                output = template.render(page = node)
+
+            print(recorder.dependencies)
+    """
+    def __init__(self):
+        self.dependencies = set()
+        self._previous    = None
+
+    def __enter__(self):
+        self._previous  = getattr(_local, 'recorder', None)
+        _local.recorder = self
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _local.recorder = self._previous
+
+
+def record(key):
+    """ Record the dependency on the node identified by ``key`` if the recording is active. """
+    recorder = getattr(_local, 'recorder', None)
+
+    if recorder is not None:
+        recorder.dependencies.add(key)
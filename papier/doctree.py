@@ -1,9 +1,52 @@
 import codecs
 import hashlib
 import os
-import re
+import sys
+
+from .dependency import record
+
 
 class DocBase(object):
+    __slots__ = ()
+
+    @property
+    def name(self):
+        return self.fs_node.name if self.fs_node else None
+
+    @property
+    def kind(self):
+        return self.fs_node.kind if self.fs_node else None
+
+    @property
+    def reference_path(self):
+        return self.fs_node.reference_path if self.fs_node else None
+
+    @property
+    def src_path(self):
+        return self.fs_node.src_path if self.fs_node else None
+
+    @property
+    def output_path(self):
+        return self.fs_node.output_path if self.fs_node else None
+
+    @property
+    def cache_path(self):
+        return self.fs_node.cache_path if self.fs_node else None
+
+    @property
+    def interpreter(self):
+        return self.fs_node.interpreter if self.fs_node else None
+
+    @property
+    def content(self):
+        return self.fs_node.content if self.fs_node else None
+
+    def is_file(self):
+        return self.fs_node.is_file() if self.fs_node else False
+
+    def is_dir(self):
+        return self.fs_node.is_dir() if self.fs_node else True
+
     @property
     def ancestors(self):
         """ From leaf to root """
@@ -42,15 +85,14 @@ class DocBase(object):
             '/'.join(self.tree_path[self_level - diff_level - 1:]),
         )
 
-    def __getattr__(self, name):
-        return getattr(self.fs_node, name) if self.fs_node else None
-
     def __repr__(self):
         return '<{} name="{}">'.format(type(self).__name__, self.name or '(root)')
 
 
 class DocTree(DocBase, dict):
     """ FSNode Tree """
+    __slots__ = ('fs_node', 'parent')
+
     def __init__(self, level):
         self.fs_node = None
         self.parent  = None
@@ -73,6 +115,8 @@ class DocTree(DocBase, dict):
 
     @property
     def path(self):
+        record(self.dependency_key)
+
         if 'index' in self:
             return self['index'].path
 
@@ -80,22 +124,20 @@ class DocTree(DocBase, dict):
 
     @property
     def title(self):
+        record(self.dependency_key)
+
         if 'index' in self:
             return self['index'].title
 
         return None
 
-    def __getattr__(self, name):
-        return getattr(self.fs_node, name) if self.fs_node else None
+    @property
+    def dependency_key(self):
+        return self.fs_node.reference_path if self.fs_node else ''
 
 
 class DocNode(DocBase):
-    _re_h1 = re.compile('<h1(?P<extra> [^>]+)?>(?P<title>.*)</h1>', re.M)
-    _re_h2 = re.compile('<h2(?P<extra> [^>]+)?>(?P<title>.*)</h2>', re.M)
-    _re_h3 = re.compile('<h3(?P<extra> [^>]+)?>(?P<title>.*)</h3>', re.M)
-    _re_h4 = re.compile('<h4(?P<extra> [^>]+)?>(?P<title>.*)</h4>', re.M)
-    _re_h5 = re.compile('<h5(?P<extra> [^>]+)?>(?P<title>.*)</h5>', re.M)
-    _re_h6 = re.compile('<h6(?P<extra> [^>]+)?>(?P<title>.*)</h6>', re.M)
+    __slots__ = ('level', 'fs_node', 'parent')
 
     def __init__(self, level):
         self.level   = level
@@ -104,21 +146,22 @@ class DocNode(DocBase):
 
     @property
     def title(self):
-        compiled = self.fs_node.content
-
-        matches = (
-            self._re_h1.match(compiled)
-            or self._re_h2.match(compiled)
-            or self._re_h3.match(compiled)
-            or self._re_h4.match(compiled)
-            or self._re_h5.match(compiled)
-            or self._re_h6.match(compiled)
-        )
+        record(self.dependency_key)
+
+        return self.fs_node.title
 
-        return matches.groupdict()['title'] if matches else None
+    @property
+    def outline(self):
+        return self.fs_node.outline or []
 
     @property
     def path(self):
+        record(self.dependency_key)
+
+        return self.fs_node.reference_path
+
+    @property
+    def dependency_key(self):
         return self.fs_node.reference_path
 
 
@@ -132,6 +175,8 @@ class Factory(object):
             tree_iterator = tree # Reset to the root.
 
             for fs_vertex in tree_path[:-1]:
+                fs_vertex = sys.intern(fs_vertex)
+
                 if fs_vertex not in tree_iterator:
                     tree_iterator[fs_vertex] = DocTree(tree_iterator.level + 1)
 
@@ -144,7 +189,7 @@ class Factory(object):
                     tree_iterator.parent = parent_node
 
             # Handle the last level.
-            doc_name = tree_path[-1]
+            doc_name = sys.intern(tree_path[-1])
 
             if doc_name in tree_iterator and tree_iterator[doc_name].fs_node:
                 continue
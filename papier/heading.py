@@ -0,0 +1,26 @@
+import re
+
+_re_headings = [
+    re.compile('<h{level}(?P<extra> [^>]+)?>(?P<title>.*)</h{level}>'.format(level = level), re.M)
+    for level in range(1, 7)
+]
+_re_any_heading = re.compile('<h(?P<level>[1-6])(?P<extra> [^>]+)?>(?P<title>.*)</h(?P=level)>', re.M)
+
+
+def extract_title(html):
+    """ Extract the title from the leading heading of the interpreted HTML """
+    for re_heading in _re_headings:
+        matches = re_heading.match(html)
+
+        if matches:
+            return matches.group('title')
+
+    return None
+
+
+def extract_outline(html):
+    """ Extract the list of ``[level, title]`` of every heading in the interpreted HTML """
+    return [
+        [int(matches.group('level')), matches.group('title')]
+        for matches in _re_any_heading.finditer(html)
+    ]
@@ -0,0 +1,147 @@
+import codecs
+import hashlib
+import html
+import os
+import re
+
+try:
+    import pygments
+
+    from pygments            import highlight
+    from pygments.formatters import HtmlFormatter
+    from pygments.lexers     import get_lexer_by_name
+    from pygments.util       import ClassNotFound
+except ImportError:
+    pygments = None
+
+CACHE_DIRNAME       = 'highlight'
+STYLESHEET_FILENAME = 'highlight.css'
+CSS_CLASS           = 'highlight'
+
+
+class HighlighterUnavailableError(RuntimeError):
+    """ Highlighter Unavailable """
+
+
+def get_stylesheet(style = None):
+    """ Get the stylesheet of the highlighted code blocks for the Pygments style """
+    if not pygments:
+        raise HighlighterUnavailableError('"pygments" is not installed.')
+
+    return HtmlFormatter(style = style or 'default').get_style_defs('.{}'.format(CSS_CLASS))
+
+
+class CodeHighlighter(object):
+    """ Code Highlighter
+
+        Highlight the code blocks of the interpreted HTML with Pygments:
+
+        * ``<pre lang="python">...</pre>`` (reStructuredText),
+        * ``<pre lang="python"><code>...</code></pre>`` (``github-markup``),
+        * ``<pre><code class="language-python">...</code></pre>`` (Python-Markdown).
+
+        The highlighted blocks are cached by the language and the digest of
+        the code, in memory and in ``cache_path``, so an unchanged block is
+        never highlighted again. The blocks without a language or in an
+        unknown language are left untouched.
+
+        :param cache_path: the directory of the cached blocks, ``None`` to only cache in memory
+    """
+    _re_block = re.compile(
+        r'<pre(?P<pre_attrs>[^>]*)>\s*(?:<code(?P<code_attrs>[^>]*)>)?(?P<code>[^<]*)(?:</code>)?\s*</pre>',
+        re.I,
+    )
+    _re_lang  = re.compile(r'\blang="(?P<language>[^"]+)"')
+    _re_class = re.compile(r'\bclass="(?:[^"]*\s)?(?:language|lang)-(?P<language>[^"\s]+)')
+
+    def __init__(self, cache_path = None):
+        if not pygments:
+            raise HighlighterUnavailableError('"pygments" is not installed.')
+
+        self.cache_path = cache_path
+        self._cache     = {}  # (language, digest) -> highlighted HTML
+        self._formatter = HtmlFormatter(nowrap = True)
+
+    def __getstate__(self):
+        # The cached blocks are not sent to the worker processes.
+        state = dict(self.__dict__)
+
+        state['_cache'] = {}
+
+        return state
+
+    def highlight(self, content):
+        """ Highlight every code block of the HTML """
+        return self._re_block.sub(self._replace, content)
+
+    def highlight_code(self, code, language):
+        """ Highlight the code
+
+            :return: the highlighted HTML, ``None`` if the language is unknown
+        """
+        digest = hashlib.sha1(
+            '{}\0{}\0{}'.format(pygments.__version__, language, code).encode('utf-8')
+        ).hexdigest()
+        key    = (language, digest)
+
+        if key in self._cache:
+            return self._cache[key]
+
+        cache_file_path = os.path.join(self.cache_path, digest[:2], digest + '.html') if self.cache_path else None
+
+        if cache_file_path and os.path.exists(cache_file_path):
+            with codecs.open(cache_file_path, 'r', 'utf-8') as f:
+                highlighted = f.read()
+        else:
+            try:
+                lexer = get_lexer_by_name(language)
+            except ClassNotFound:
+                lexer = None
+
+            highlighted = highlight(code, lexer, self._formatter) if lexer else None
+
+            if cache_file_path and highlighted is not None:
+                self._write_cache(cache_file_path, highlighted)
+
+        self._cache[key] = highlighted
+
+        return highlighted
+
+    def _replace(self, matches):
+        language = self._get_language(matches.group('pre_attrs'), matches.group('code_attrs') or '')
+
+        if not language:
+            return matches.group(0)
+
+        highlighted = self.highlight_code(html.unescape(matches.group('code')), language.lower())
+
+        if highlighted is None:
+            return matches.group(0)
+
+        return '<pre class="{}" lang="{}"><code>{}</code></pre>'.format(
+            CSS_CLASS,
+            html.escape(language),
+            highlighted,
+        )
+
+    def _get_language(self, pre_attrs, code_attrs):
+        for re_language, attrs in ((self._re_lang, pre_attrs), (self._re_class, code_attrs)):
+            matches = re_language.search(attrs)
+
+            if matches:
+                return matches.group('language')
+
+        return None
+
+    def _write_cache(self, path, highlighted):
+        dir_path = os.path.dirname(path)
+
+        os.makedirs(dir_path, 0o755, exist_ok = True)
+
+        # Written to a temporary file first as the worker processes share the cache.
+        temp_path = '{}.{}.tmp'.format(path, os.getpid())
+
+        with codecs.open(temp_path, 'w', 'utf-8') as f:
+            f.write(highlighted)
+
+        os.replace(temp_path, path)
@@ -1,43 +1,428 @@
 import codecs
 import os
 import re
+import sys
+import time
+
+from collections        import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .cache     import create_cache, make_cache_key
+from .heading   import extract_outline, extract_title
+from .highlight import CACHE_DIRNAME as HIGHLIGHT_CACHE_DIRNAME, CodeHighlighter
+from .manifest  import digest_file
+from .profiling import NULL_PROFILER
+
+# The handlers of the current worker process (see ``_init_worker``).
+_worker_handlers = None
+
+
+class InterpretationError(RuntimeError):
+    """ Interpretation Error
+
+        :param failures: the list of ``(fs_node, exception)`` pairs
+    """
+    def __init__(self, failures):
+        self.failures = failures
+
+        super().__init__('Failed to interpret {} file(s): {}'.format(
+            len(failures),
+            ', '.join(fs_node.reference_path for fs_node, _ in failures),
+        ))
 
 
 class Handler(object):
+    """ Interpretation Handler
+
+        A handler declares the extensions of the files it interprets with
+        :attr:`extensions`, so that the interpreter finds it with a single
+        lookup. A handler matching the nodes otherwise (e.g. with a pattern)
+        or refusing some of the files with its extensions overrides
+        :meth:`can_handle`, which the interpreter then calls for every node
+        which the handler may interpret.
+
+        When several handlers match a node, the first one in the list of the
+        interpreter wins.
+    """
+    version     = '1'
+    extensions  = ()  # e.g. ('.md',), in lower case
+    highlighter = None
+
+    def signature(self):
+        """ Identify the handler and the settings affecting its output """
+        signature = '{}.{}/{}'.format(type(self).__module__, type(self).__name__, self.version)
+
+        if self.highlighter:
+            signature += '+highlight'
+
+        return signature
+
+    def configure(self, config, persistent = True):
+        """ Receive the site configuration before the interpretation starts
+
+            :param persistent: whether the highlighted code blocks are cached
+                               on the disk, or only in memory otherwise
+        """
+        if not config.highlight.enabled:
+            self.highlighter = None
+
+            return
+
+        cache_path = None
+
+        if persistent:
+            cache_path = os.path.join(os.path.abspath(config.source.path), '.papier-cache', HIGHLIGHT_CACHE_DIRNAME)
+
+        if not self.highlighter or self.highlighter.cache_path != cache_path:
+            self.highlighter = CodeHighlighter(cache_path)
+
+    def highlight(self, html):
+        """ Highlight the code blocks of the interpreted HTML when enabled """
+        return self.highlighter.highlight(html) if self.highlighter else html
+
     def can_handle(self, fs_node):
-        raise NotImplementedError()
+        return (
+            fs_node.is_file() and
+            os.path.splitext(fs_node.reference_path)[1].lower() in self.extensions
+        )
+
+
+def _init_worker(handlers):
+    global _worker_handlers
+
+    _worker_handlers = handlers
+
+
+def _interpret_in_worker(handler_index, fs_node, timed):
+    handler = _worker_handlers[handler_index]
+
+    return _interpret_with_timing(handler, fs_node) if timed else (handler.process(fs_node), None)
+
+
+def _interpret_with_timing(handler, fs_node):
+    """ Interpret the node
+
+        :return: the HTML and the ``(start, wall time, CPU time, process ID)`` of the interpretation
+    """
+    started_at     = time.perf_counter()
+    cpu_started_at = time.process_time()
+
+    html = handler.process(fs_node)
+
+    return html, (started_at, time.perf_counter() - started_at, time.process_time() - cpu_started_at, os.getpid())
 
 
 class Interpreter(object):
     def __init__(self, handlers):
-        self.handlers = handlers
-        self.re_ext   = re.compile('\.[a-z\d]+$', re.I)
-        self.html_ext = '.html'
+        self.handlers     = handlers
+        self.profiler     = NULL_PROFILER
+        self.shared_cache = None
+        self._dispatch    = None  # see _index_handlers
+        self.re_ext       = re.compile('\.[a-z\d]+$', re.I)
+        self.html_ext     = '.html'
+
+    def configure(self, config, persistent = True):
+        """ Configure the handlers for the site
+
+            :param persistent: whether the handlers may write their caches
+                               under ``.papier-cache``, e.g. not for the preview
+        """
+        for handler in self.handlers:
+            handler.configure(config, persistent)
+
+        self.shared_cache = create_cache(config.cache)
+        self._dispatch    = self._index_handlers()
 
     def prepare(self, fs_nodes):
         for fs_node in fs_nodes:
+            handler = self.find_handler(fs_node)
+
+            if not handler:
+                continue
+
+            fs_node.output_path    = self.re_ext.sub(self.html_ext, fs_node.output_path)
+            fs_node.reference_path = sys.intern(self.re_ext.sub(self.html_ext, fs_node.reference_path))
+            fs_node.interpreter    = handler
+
+    def find_handler(self, fs_node):
+        """ Find the first handler interpreting the node, ``None`` if there is none """
+        if self._dispatch is None:
+            self._dispatch = self._index_handlers()
+
+        by_extension, fallbacks = self._dispatch
+
+        candidates = fallbacks
+
+        if fs_node.is_file():
+            candidates = by_extension.get(os.path.splitext(fs_node.reference_path)[1].lower(), fallbacks)
+
+        for handler, is_checked in candidates:
+            if not is_checked or handler.can_handle(fs_node):
+                return handler
+
+        return None
+
+    def _index_handlers(self):
+        """ Index the handlers by the extensions they declare
+
+            :return: the candidate handlers per extension and the candidate
+                     handlers of the other nodes, as ``(handler, is_checked)``
+                     in the order of the handlers, where ``is_checked`` tells
+                     whether :meth:`Handler.can_handle` has to be called
+        """
+        checked_handlers = [
+            handler
+            for handler in self.handlers
+            if type(handler).can_handle is not Handler.can_handle
+        ]
+        by_extension     = {}
+
+        for extension in {extension.lower() for handler in self.handlers for extension in handler.extensions}:
+            candidates = []
+
             for handler in self.handlers:
-                if not handler.can_handle(fs_node):
-                    continue
+                if handler in checked_handlers:
+                    candidates.append((handler, True))
+                elif extension in handler.extensions:
+                    candidates.append((handler, False))
 
-                fs_node.output_path    = self.re_ext.sub(self.html_ext, fs_node.output_path)
-                fs_node.reference_path = self.re_ext.sub(self.html_ext, fs_node.reference_path)
-                fs_node.interpreter    = handler
+                    break  # interprets every file with the extension
 
-    def process(self, fs_nodes):
-        for fs_node in fs_nodes:
-            if not fs_node.interpreter:
-                continue
+            by_extension[extension] = tuple(candidates)
+
+        return by_extension, tuple((handler, True) for handler in checked_handlers)
+
+    def process(self, fs_nodes, jobs = 1, manifest = None):
+        """ Interpret the updated nodes and write their caches
+
+            See :class:`InterpretationBatch` to receive the nodes as soon as
+            they are interpreted.
+        """
+        with self.batch(jobs, manifest) as batch:
+            for fs_node in fs_nodes:
+                batch.add(fs_node)
+
+            for _ in batch.results():
+                pass
+
+    def batch(self, jobs = 1, manifest = None):
+        return InterpretationBatch(self, jobs, manifest)
+
+    def interpret(self, fs_node):
+        """ Interpret the node in memory without writing its cache
+
+            :return: the interpreted HTML
+        """
+        html = fs_node.interpret()
+
+        self._describe(fs_node, html)
+
+        return html
+
+    def _store(self, fs_node, html, manifest, source_digest = None):
+        self._write_cache(fs_node, html)
+        self._describe(fs_node, html)
+
+        if manifest:
+            manifest.record_interpretation(fs_node, html, source_digest)
+
+    def _describe(self, fs_node, html):
+        fs_node.title   = extract_title(html)
+        fs_node.outline = extract_outline(html)
+
+    def _write_cache(self, fs_node, html):
+        dir_path = os.path.dirname(fs_node.cache_path)
+
+        if not os.path.exists(dir_path):
+            os.makedirs(dir_path, 0o755)
+
+        # Written to a temporary file first as the shards share the index pages.
+        temp_path = '{}.{}.tmp'.format(fs_node.cache_path, os.getpid())
+
+        with codecs.open(temp_path, 'w') as f:
+            f.write(html)
+
+        os.replace(temp_path, fs_node.cache_path)
+
+
+class InterpretationBatch(object):
+    """ Interpretation Batch
+
+        Interpret the nodes as they are added and give them back, with their
+        caches written and their interpretations recorded, as soon as they are
+        interpreted:
+
+        .. code-block:: python
+
+            with interpreter.batch(jobs, manifest) as batch:
+                for fs_node in walker.iterate(...):
+                    batch.add(fs_node)
+
+                for fs_node in batch.results():
+                    print(fs_node.title)
+
+        A node is interpreted unless the build manifest confirms that its
+        source, its handler and its cache have not changed, in which case its
+        title and outline are restored from the manifest without reading the
+        cache. With a shared cache (see :mod:`papier.cache`), a node whose
+        source and handler have been interpreted before, by any build sharing
+        the cache, is restored from it instead.
+
+        When ``jobs`` is greater than one, the nodes are sent to the worker
+        processes as soon as they are added while the caches are still written
+        by this process, and the nodes are given back in the order in which
+        they are interpreted. Every failure is collected and reported at the
+        end with :class:`InterpretationError`.
+
+        :param interpreter: the interpreter
+        :param jobs:        the number of worker processes
+        :param manifest:    the build manifest, ``None`` to interpret every node
+    """
+    def __init__(self, interpreter, jobs = 1, manifest = None):
+        self.interpreter     = interpreter
+        self.jobs            = jobs
+        self.manifest        = manifest
+        self._queued_nodes   = deque()  # the nodes not sent to the worker processes yet
+        self._futures        = {}  # future -> node
+        self._executor       = None
+        self._source_digests = {}  # reference path -> digest of the source
+        self._timed          = interpreter.profiler.enabled
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._executor:
+            self._executor.shutdown(cancel_futures = exc_type is not None)
+
+            self._executor = None
+
+    def add(self, fs_node):
+        """ Add the node to interpret
+
+            :return: whether the node is to be interpreted, i.e. it has a
+                     handler and it is not restored from a cache
+        """
+        if not fs_node.interpreter:
+            return False
+
+        manifest     = self.manifest
+        interpreter  = self.interpreter
+        shared_cache = interpreter.shared_cache
+
+        if manifest and manifest.is_interpreted(fs_node):
+            manifest.restore_interpretation(fs_node)
+
+            return False
+
+        if shared_cache:
+            source_digest = digest_file(fs_node.src_path)
+            html          = shared_cache.get(make_cache_key(source_digest, fs_node.interpreter.signature()))
+
+            if html is not None:
+                interpreter._store(fs_node, html, manifest, source_digest)
+
+                return False
+
+            self._source_digests[fs_node.reference_path] = source_digest
+
+        self._queued_nodes.append(fs_node)
+
+        # The worker processes only start once there are two nodes to interpret.
+        if self.jobs > 1 and (self._executor or len(self._queued_nodes) > 1):
+            self._submit_queued_nodes()
+
+        return True
+
+    def results(self):
+        """ Interpret the remaining nodes and yield every interpreted node """
+        results      = self._interpret()
+        interpreter  = self.interpreter
+        shared_cache = interpreter.shared_cache
+        failures     = []
+
+        for fs_node, html, error, timing in results:
+            if error:
+                failures.append((fs_node, error))
 
-            if not fs_node.is_updated():
                 continue
 
-            html = fs_node.interpret()
+            if timing:
+                started_at, wall, cpu, pid = timing
+
+                interpreter.profiler.record(
+                    'interpret:{}'.format(type(fs_node.interpreter).__name__),
+                    wall,
+                    cpu,
+                    fs_node.reference_path,
+                    started_at,
+                    pid if pid != os.getpid() else None,
+                )
+
+            source_digest = self._source_digests.pop(fs_node.reference_path, None)
+
+            if shared_cache:
+                shared_cache.put(make_cache_key(source_digest, fs_node.interpreter.signature()), html)
+
+            interpreter._store(fs_node, html, self.manifest, source_digest)
+
+            yield fs_node
+
+        if shared_cache:
+            shared_cache.evict()
 
-            dir_path = os.path.dirname(fs_node.cache_path)
+        if failures:
+            failures.sort(key = lambda failure: failure[0].reference_path)
 
-            if not os.path.exists(dir_path):
-                os.makedirs(dir_path, 0o755)
+            raise InterpretationError(failures)
+
+    def _submit_queued_nodes(self):
+        handlers = self.interpreter.handlers
+
+        if not self._executor:
+            self._executor = ProcessPoolExecutor(
+                max_workers = self.jobs,
+                initializer = _init_worker,
+                initargs    = (handlers,),
+            )
+
+        for fs_node in self._queued_nodes:
+            future = self._executor.submit(_interpret_in_worker, handlers.index(fs_node.interpreter), fs_node, self._timed)
+
+            self._futures[future] = fs_node
+
+        self._queued_nodes.clear()
+
+    def _interpret(self):
+        # The nodes may still be added while the results are given back.
+        while self._queued_nodes or self._futures:
+            if self._executor:
+                self._submit_queued_nodes()
+
+                yield from self._collect()
+            else:
+                yield self._interpret_serially(self._queued_nodes.popleft())
+
+    def _interpret_serially(self, fs_node):
+        try:
+            if self._timed:
+                html, timing = _interpret_with_timing(fs_node.interpreter, fs_node)
+            else:
+                html, timing = fs_node.interpret(), None
+        except Exception as e:
+            return fs_node, None, e, None
+
+        return fs_node, html, None, timing
+
+    def _collect(self):
+        for future in as_completed(list(self._futures)):
+            fs_node = self._futures.pop(future)
+
+            try:
+                html, timing = future.result()
+            except Exception as e:
+                yield fs_node, None, e, None
+
+                continue
 
-            with codecs.open(fs_node.cache_path, 'w') as f:
-                f.write(html)
+            yield fs_node, html, None, timing
@@ -0,0 +1,26 @@
+import re
+
+_re_source_link = re.compile('^(?P<path>[^:?#]+)\.(?:md|markdown|rst)(?P<suffix>[?#].*)?$', re.I)
+_re_anchor_href = re.compile('(?P<before><a\s[^>]*?\\bhref=")(?P<href>[^"]*)(?P<after>")', re.I)
+
+
+def rewrite_source_link(href):
+    """ Point a relative link to a source document (e.g. ``guide.md#usage``) to its page (``guide.html#usage``). """
+    matches = _re_source_link.search(href)
+
+    if not matches:
+        return href
+
+    return '{}.html{}'.format(matches.group('path'), matches.group('suffix') or '')
+
+
+def rewrite_source_links(html):
+    """ Rewrite the ``href`` of every anchor in an HTML fragment produced by an external converter """
+    return _re_anchor_href.sub(
+        lambda matches: '{}{}{}'.format(
+            matches.group('before'),
+            rewrite_source_link(matches.group('href')),
+            matches.group('after'),
+        ),
+        html,
+    )
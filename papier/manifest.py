@@ -0,0 +1,298 @@
+import hashlib
+import json
+import os
+
+MANIFEST_FILENAME = 'manifest.json'
+
+
+def digest_bytes(content):
+    return hashlib.sha1(content).hexdigest()
+
+
+def digest_text(content):
+    return digest_bytes(content.encode('utf-8'))
+
+
+def digest_file(path):
+    sha1 = hashlib.sha1()
+
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            sha1.update(chunk)
+
+    return sha1.hexdigest()
+
+
+def file_stat(path):
+    """ Get the cheap signature of a file, ``None`` if the file does not exist. """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class BuildManifest(object):
+    """ Build Manifest
+
+        The manifest is stored beside the interpretation cache and records,
+        per source, the content digest of the source, the handler signature,
+        the digest of the cached HTML, the title and the outline extracted from
+        it and the digest of the rendered output. The files published as they
+        are (e.g. images) only record the digests of the source and the output.
+        The file signatures (size and mtime) only serve as a shortcut to avoid
+        re-reading the files whose signatures have not changed since the
+        digests were recorded.
+    """
+    version = 2
+
+    def __init__(self, path, fingerprint = None, entries = None):
+        self.path        = path
+        self.fingerprint = fingerprint
+        self.entries     = entries or {}
+        self.changed     = set()  # reference paths interpreted, added or removed in this build
+        self.invalidated = set()  # dependency keys whose titles or paths may have changed
+        self.forgotten   = set()  # reference paths whose entries are removed in this build
+        self._seen       = set()
+        self._rendered   = []
+        self._dirty      = True  # whether the entries changed since the manifest was loaded or saved
+
+    @staticmethod
+    def load(path):
+        if not os.path.exists(path):
+            return BuildManifest(path)
+
+        try:
+            with open(path, 'r', encoding = 'utf-8') as f:
+                data = json.loads(f.read())
+        except ValueError:
+            return BuildManifest(path)
+
+        if data.get('version') != BuildManifest.version:
+            return BuildManifest(path)
+
+        manifest        = BuildManifest(path, data['fingerprint'], data['entries'])
+        manifest._dirty = False
+
+        return manifest
+
+    def save(self):
+        """ Save the manifest unless nothing changed since it was loaded or saved """
+        if not self._dirty:
+            return
+
+        dir_path = os.path.dirname(self.path)
+
+        if not os.path.exists(dir_path):
+            os.makedirs(dir_path, 0o755)
+
+        temp_path = '{}.tmp'.format(self.path)
+
+        # Serialized at once, which is much faster than streaming it to the file.
+        content = json.dumps(
+            {
+                'version'     : self.version,
+                'fingerprint' : self.fingerprint,
+                'entries'     : self.entries,
+            },
+            sort_keys = True,
+        )
+
+        with open(temp_path, 'w', encoding = 'utf-8') as f:
+            f.write(content)
+
+        os.replace(temp_path, self.path)
+
+        self._dirty = False
+
+    def use_fingerprint(self, fingerprint):
+        """ Set the digest of the templates and the configuration
+
+            When it differs from the previous build, every output is considered
+            stale while the interpretation caches remain valid.
+        """
+        if self.fingerprint == fingerprint:
+            return
+
+        self.fingerprint = fingerprint
+        self._dirty      = True
+
+        for entry in self.entries.values():
+            entry.pop('output', None)
+
+    def is_interpreted(self, fs_node):
+        """ Check if the interpretation cache of the node is still valid """
+        self._seen.add(fs_node.reference_path)
+
+        entry = self.entries.get(fs_node.reference_path)
+
+        if not entry or entry.get('handler') != fs_node.interpreter.signature():
+            return False
+
+        return (
+            self._match(entry, 'source', fs_node.src_path)
+            and self._match(entry, 'cache', fs_node.cache_path)
+        )
+
+    def restore_interpretation(self, fs_node):
+        entry = self.entries[fs_node.reference_path]
+
+        fs_node.title   = entry.get('title')
+        fs_node.outline = entry.get('outline')
+
+    def record_interpretation(self, fs_node, html, source_digest = None):
+        """ Record the interpretation of the node
+
+            :param source_digest: the digest of the source if already known
+        """
+        previous_entry = self.entries.get(fs_node.reference_path)
+
+        self.changed.add(fs_node.reference_path)
+
+        self._dirty = True
+
+        # The other pages only read the title and the path of this page.
+        if not previous_entry:
+            self._invalidate(fs_node.reference_path, True)
+        elif previous_entry.get('title') != fs_node.title:
+            self._invalidate(fs_node.reference_path, False)
+
+        self.entries[fs_node.reference_path] = {
+            'handler' : fs_node.interpreter.signature(),
+            'source'  : [source_digest or digest_file(fs_node.src_path), file_stat(fs_node.src_path)],
+            'cache'   : [digest_text(html), file_stat(fs_node.cache_path)],
+            'title'   : fs_node.title,
+            'outline' : fs_node.outline,
+        }
+
+    def needs_rendering(self, fs_node):
+        """ Check if the page or any node it depends on has changed """
+        entry = self.entries.get(fs_node.reference_path)
+
+        return (
+            not entry
+            or fs_node.reference_path in self.changed
+            or not self.invalidated.isdisjoint(entry.get('depends', ()))
+            or not self._match(entry, 'output', fs_node.output_path)
+        )
+
+    def record_rendering(self, fs_node, output_digest, dependencies = None):
+        """ Record the rendered page
+
+            The signature of the output is recorded by :meth:`record_output_stats`
+            once the output is actually written.
+        """
+        entry = self.entries.setdefault(fs_node.reference_path, {})
+
+        entry['output']  = [output_digest, None]
+        entry['depends'] = sorted(set(dependencies or ()) - {fs_node.reference_path})
+
+        self._rendered.append(fs_node)
+
+        self._dirty = True
+
+    def is_published(self, fs_node):
+        """ Check if the file published as it is (e.g. an image) is still up to date """
+        self._seen.add(fs_node.reference_path)
+
+        entry = self.entries.get(fs_node.reference_path)
+
+        return bool(entry) and (
+            self._match(entry, 'source', fs_node.src_path)
+            and self._match(entry, 'output', fs_node.output_path)
+        )
+
+    def record_publication(self, fs_node, digest):
+        self.entries[fs_node.reference_path] = {
+            'source' : [digest, file_stat(fs_node.src_path)],
+            'output' : [digest, None],
+        }
+
+        self._rendered.append(fs_node)
+
+        self._dirty = True
+
+    def record_presence(self, fs_node):
+        """ Record a file which is neither interpreted nor published by this build (e.g. in another shard)
+
+            Only its addition affects the other pages.
+        """
+        self._seen.add(fs_node.reference_path)
+
+        if fs_node.reference_path not in self.entries:
+            self.entries[fs_node.reference_path] = {}
+
+            self._invalidate(fs_node.reference_path, True)
+
+            self._dirty = True
+
+    def record_output_stats(self):
+        for fs_node in self._rendered:
+            self.entries[fs_node.reference_path]['output'][1] = file_stat(fs_node.output_path)
+
+        self._rendered = []
+
+    def reset_changes(self):
+        """ Forget the changes of the previous build when the manifest is kept in memory """
+        self.changed     = set()
+        self.invalidated = set()
+        self.forgotten   = set()
+        self._seen       = set()
+        self._rendered   = []
+
+    def forget(self, reference_path):
+        """ Remove the entry of a source which may no longer exist
+
+            If the source still exists, it is recorded again when interpreted.
+        """
+        if reference_path not in self.entries:
+            return
+
+        del self.entries[reference_path]
+
+        self.forgotten.add(reference_path)
+
+        self._dirty = True
+        self._invalidate(reference_path, True)
+
+    def get_removed_paths(self):
+        """ Get the reference paths of the forgotten entries which are not recorded again """
+        return sorted(self.forgotten - set(self.entries))
+
+    def forget_unseen(self):
+        """ Remove the entries of the sources which no longer exist """
+        for reference_path in set(self.entries) - self._seen:
+            self.forget(reference_path)
+
+    def _invalidate(self, reference_path, is_structural):
+        self.changed.add(reference_path)
+        self.invalidated.add(reference_path)
+
+        # Adding or removing a page may change the title, the path and the
+        # kind of its directory (e.g. the index page).
+        if is_structural:
+            self.invalidated.add(os.path.dirname(reference_path))
+
+    def _match(self, entry, key, path):
+        if key not in entry:
+            return False
+
+        digest, stat = entry[key]
+        actual_stat  = file_stat(path)
+
+        if not actual_stat:
+            return False
+
+        if actual_stat == stat:
+            return True
+
+        if digest_file(path) != digest:
+            return False
+
+        # Same content with a new signature (e.g. a fresh checkout).
+        entry[key] = [digest, actual_stat]
+
+        self._dirty = True
+
+        return True
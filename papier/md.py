@@ -1,21 +1,118 @@
-import re
+import codecs
 import subprocess
 
 from .interpreter import Handler
+from .links       import rewrite_source_link, rewrite_source_links
 
+try:
+    import markdown
 
-class MarkDownHandler(Handler):
+    from markdown.extensions     import Extension
+    from markdown.treeprocessors import Treeprocessor
+except ImportError:
+    markdown = None
+
+
+class MarkdownEngineUnavailableError(RuntimeError):
+    """ Markdown Engine Unavailable """
+
+
+class GitHubMarkupEngine(object):
+    """ Spawn ``github-markup`` once per document """
     def __init__(self):
-        self._re_supported_ext = re.compile('\.(md|markdown)$', re.I)
-        self._cli_cmd          = 'github-markup {input}'
+        self._cli_cmd = 'github-markup {input}'
+
+    def convert(self, fs_node):
+        actual_cmd = self._cli_cmd.format(input = fs_node.src_path)
+
+        html = subprocess.check_output(actual_cmd, shell = True).decode('utf-8')
+
+        return rewrite_source_links(html)
+
+
+if markdown:
+    class SourceLinkTreeprocessor(Treeprocessor):
+        """ Point the links to the source documents to their pages """
+        def run(self, root):
+            for element in root.iter('a'):
+                href = element.get('href')
 
-    def can_handle(self, fs_node):
-        return (
-            fs_node.is_file() and
-            bool(self._re_supported_ext.search(fs_node.reference_path))
+                if href:
+                    element.set('href', rewrite_source_link(href))
+
+
+    class SourceLinkExtension(Extension):
+        def extendMarkdown(self, md):
+            md.treeprocessors.register(SourceLinkTreeprocessor(md), 'papier_source_link', 0)
+
+
+class PythonMarkdownEngine(object):
+    """ In-process Python-Markdown with GitHub-flavored extensions
+
+        The converter is created once and reset between documents so that
+        no process is spawned per page.
+    """
+    extensions = ['extra', 'sane_lists']
+
+    def __init__(self):
+        if not markdown:
+            raise MarkdownEngineUnavailableError('"markdown" is not installed.')
+
+        self._converter = markdown.Markdown(
+            extensions    = self.extensions + [SourceLinkExtension()],
+            output_format = 'html5',
         )
 
-    def process(self, fs_node):
-        actual_cmd = self._cli_cmd.format(input = fs_node.src_path)
+    def convert(self, fs_node):
+        with codecs.open(fs_node.src_path, 'r', 'utf-8') as f:
+            text = f.read()
 
-        return subprocess.check_output(actual_cmd, shell = True).decode('utf-8')
+        return self._converter.reset().convert(text)
+
+
+ENGINES = {
+    'github-markup' : GitHubMarkupEngine,
+    'python'        : PythonMarkdownEngine,
+}
+
+
+class MarkDownHandler(Handler):
+    version    = '2'
+    extensions = ('.md', '.markdown')
+
+    def __init__(self):
+        self._engine_name = 'github-markup'
+        self._engine      = None
+
+    def signature(self):
+        return '{}:{}'.format(super().signature(), self._engine_name)
+
+    def configure(self, config, persistent = True):
+        super().configure(config, persistent)
+
+        engine_name = config.markdown.engine
+
+        if engine_name not in ENGINES:
+            raise MarkdownEngineUnavailableError('Unknown Markdown engine: {}'.format(engine_name))
+
+        if engine_name != self._engine_name:
+            self._engine = None
+
+        self._engine_name = engine_name
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+
+        state['_engine'] = None
+
+        return state
+
+    @property
+    def engine(self):
+        if not self._engine:
+            self._engine = ENGINES[self._engine_name]()
+
+        return self._engine
+
+    def process(self, fs_node):
+        return self.highlight(self.engine.convert(fs_node))
@@ -0,0 +1,78 @@
+import re
+
+# The elements around which the whitespace is not rendered.
+BLOCK_ELEMENTS = (
+    'html', 'head', 'body', 'title', 'meta', 'link', 'script', 'style', 'noscript',
+    'div', 'p', 'ul', 'ol', 'li', 'dl', 'dt', 'dd', 'blockquote', 'hr', 'pre',
+    'section', 'article', 'nav', 'aside', 'header', 'footer', 'main', 'figure', 'figcaption',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'table', 'caption', 'colgroup', 'col', 'thead', 'tbody', 'tfoot', 'tr', 'td', 'th',
+    'form', 'fieldset', 'legend', 'option', 'select',
+)
+
+
+class HTMLMinifier(object):
+    """ HTML Minifier
+
+        Collapse the whitespace of the rendered pages into a single space,
+        drop it around the block-level elements and remove the comments
+        (except the conditional comments). The content of ``<pre>``,
+        ``<code>``, ``<textarea>``, ``<script>`` and ``<style>`` and the tags
+        themselves (i.e. the attribute values) are left untouched.
+
+        .. code-block:: python
+
+            html = minifier.minify(html)
+
+            print(minifier.saved_bytes)
+
+        :param enabled: whether the pages are minified
+    """
+    _re_token = re.compile(
+        r'(?P<verbatim><(?P<element>pre|code|textarea|script|style)\b[^>]*>.*?</(?P=element)\s*>)'
+        r'|(?P<comment><!--(?!\[if).*?-->)'
+        r'|(?P<tag><(?:[^>"\']|"[^"]*"|\'[^\']*\')*>)'
+        r'|(?P<space>[ \t\n\r\f]+)',  # only the HTML whitespace, e.g. not the non-breaking spaces
+        re.S | re.I,
+    )
+    _re_block_tag = re.compile(r'</?(?:{})\b'.format('|'.join(BLOCK_ELEMENTS)), re.I)
+
+    def __init__(self, enabled = False):
+        self.enabled     = enabled
+        self.saved_bytes = 0
+
+    def reset(self):
+        self.saved_bytes = 0
+
+    def minify(self, html):
+        if not self.enabled:
+            return html
+
+        return self._re_token.sub(self._replace, html)
+
+    def _replace(self, matches):
+        token_type = matches.lastgroup
+
+        if token_type == 'comment':
+            self.saved_bytes += len(matches.group(0).encode('utf-8'))
+
+            return ''
+
+        if token_type != 'space':
+            return matches.group(0)
+
+        start, end  = matches.span()
+        replacement = '' if self._is_next_to_block_tag(matches.string, start, end) else ' '
+
+        self.saved_bytes += len(matches.group(0).encode('utf-8')) - len(replacement)
+
+        return replacement
+
+    def _is_next_to_block_tag(self, html, start, end):
+        if self._re_block_tag.match(html, end):
+            return True
+
+        if start == 0 or html[start - 1] != '>':
+            return False
+
+        return bool(self._re_block_tag.match(html, html.rfind('<', 0, start)))
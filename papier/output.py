@@ -0,0 +1,329 @@
+import os
+import shutil
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .compression import COMPRESSED_EXTENSIONS, COMPRESSIBLE_EXTENSIONS, get_compressors
+from .manifest    import digest_bytes, digest_file
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Not available on Windows
+
+DEFAULT_WRITERS = 4
+FICLONE         = 0x40049409  # Linux ioctl to clone a file (reflink)
+
+
+class OutputWriter(object):
+    """ Output Writer
+
+        Write the rendered pages from a bounded thread pool. Each directory is
+        created once, a page whose content is identical to the existing file is
+        left untouched and every page is written to a temporary file first and
+        then renamed so that a partially written page is never served.
+
+        .. code-block:: python
+
+            with writer:
+                writer.write(path, html)
+
+            print(writer.written_count, writer.skipped_count)
+
+        The files which are published as they are (e.g. images) are cloned
+        (reflink) when the file system supports it, hard-linked when allowed
+        and copied otherwise.
+
+        With ``compression`` (e.g. ``['gzip', 'brotli']``), the HTML, CSS and
+        JavaScript files get pre-compressed siblings (e.g. ``index.html.gz``),
+        compressed by the writing threads. A sibling is only compressed again
+        when the content of its file changed or when it is missing or older
+        than its file. The siblings of the formats which are not enabled are
+        removed, so a server serving the pre-compressed files (e.g. nginx with
+        ``gzip_static``) never serves a stale page.
+
+        :param writers:     the number of writing threads
+        :param hardlinks:   whether the published files may be hard-linked to their sources
+        :param compression: the names of the compression formats
+    """
+    def __init__(self, writers = None, hardlinks = True, compression = None):
+        self.writers          = writers or DEFAULT_WRITERS
+        self.hardlinks        = hardlinks
+        self.compression      = compression or []
+        self.written_count    = 0
+        self.skipped_count    = 0
+        self.compressed_count = 0
+        self._executor        = None
+        self._slots           = None
+        self._compressors     = None
+        self._failures        = []
+        self._dir_paths       = set()
+        self._lock            = threading.Lock()
+
+    def __enter__(self):
+        self.written_count    = 0
+        self.skipped_count    = 0
+        self.compressed_count = 0
+        self._executor        = ThreadPoolExecutor(max_workers = self.writers)
+        self._slots           = threading.BoundedSemaphore(self._get_capacity())
+        self._compressors     = get_compressors(self.compression)
+        self._failures        = []
+        self._dir_paths       = set()
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._executor.shutdown(wait = True)
+        self._executor    = None
+        self._compressors = None
+
+        # Report the first failure once every other page is written.
+        if self._failures and not exc_type:
+            raise self._failures[0]
+
+    def write(self, path, content):
+        """ Queue the content to write to the path
+
+            :return: the digest of the content
+        """
+        data   = content.encode('utf-8')
+        digest = digest_bytes(data)
+
+        self._make_dir(os.path.dirname(path))
+
+        if not self._executor:
+            self._write(path, data)
+
+            return digest
+
+        # Bound the number of pages held in memory while waiting to be written.
+        self._slots.acquire()
+
+        future = self._executor.submit(self._write, path, data)
+        future.add_done_callback(self._on_written)
+
+        return digest
+
+    def copy(self, src_path, path, digest, compress = True):
+        """ Queue the file to publish to the path
+
+            :param digest:   the digest of the file
+            :param compress: whether to write the pre-compressed siblings, ``False`` to leave them untouched
+        """
+        self._make_dir(os.path.dirname(path))
+
+        if not self._executor:
+            self._copy(src_path, path, digest, compress)
+
+            return
+
+        self._slots.acquire()
+
+        future = self._executor.submit(self._copy, src_path, path, digest, compress)
+        future.add_done_callback(self._on_written)
+
+    def remove(self, path, root_path = None):
+        """ Remove the file and its pre-compressed siblings, e.g. the output of a deleted source
+
+            :param root_path: the directory up to which the directories left empty are removed
+        """
+        # The source may have been replaced by a directory of the same name.
+        if os.path.isdir(path):
+            return
+
+        self._unlink(path)
+
+        for extension in COMPRESSED_EXTENSIONS:
+            self._unlink(path + extension)
+
+        if not root_path:
+            return
+
+        root_path = os.path.abspath(root_path)
+        dir_path  = os.path.dirname(os.path.abspath(path))
+
+        while dir_path.startswith(root_path + os.sep):
+            try:
+                os.rmdir(dir_path)
+            except OSError:
+                break  # not empty
+
+            self._dir_paths.clear()
+
+            dir_path = os.path.dirname(dir_path)
+
+    def flush(self):
+        """ Wait until every queued file is written """
+        if not self._executor:
+            return
+
+        # Every slot is free once no file is waiting or being written.
+        for _ in range(self._get_capacity()):
+            self._slots.acquire()
+
+        for _ in range(self._get_capacity()):
+            self._slots.release()
+
+    def _get_capacity(self):
+        return self.writers * 4
+
+    def _on_written(self, future):
+        self._slots.release()
+
+        if future.exception():
+            with self._lock:
+                self._failures.append(future.exception())
+
+    def _make_dir(self, dir_path):
+        if dir_path in self._dir_paths:
+            return
+
+        os.makedirs(dir_path, 0o755, exist_ok = True)
+
+        self._dir_paths.add(dir_path)
+
+    def _write(self, path, data):
+        if self._is_identical(path, data):
+            with self._lock:
+                self.skipped_count += 1
+
+            self._compress(path, data, False)
+
+            return
+
+        temp_path = '{}.papier-tmp'.format(path)
+
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+
+        os.replace(temp_path, path)
+
+        with self._lock:
+            self.written_count += 1
+
+        self._compress(path, data, True)
+
+    def _copy(self, src_path, path, digest, compress = True):
+        if self._is_identical_file(src_path, path, digest):
+            with self._lock:
+                self.skipped_count += 1
+
+            if compress:
+                self._compress(path, None, False)
+
+            return
+
+        temp_path = '{}.papier-tmp'.format(path)
+
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+
+        if not self._clone(src_path, temp_path) and not self._link(src_path, temp_path):
+            shutil.copyfile(src_path, temp_path)
+
+        os.replace(temp_path, path)
+
+        with self._lock:
+            self.written_count += 1
+
+        if compress:
+            self._compress(path, None, True)
+
+    def _compress(self, path, data, is_changed):
+        """ Write the pre-compressed siblings of the file
+
+            :param data:       the content of the file, ``None`` to read it
+            :param is_changed: whether the content of the file has just changed
+        """
+        if not path.endswith(COMPRESSIBLE_EXTENSIONS):
+            return
+
+        compressors = self._compressors if self._compressors is not None else get_compressors(self.compression)
+
+        enabled_extensions = {extension for extension, _ in compressors}
+
+        # The siblings written while another format was enabled
+        for extension in COMPRESSED_EXTENSIONS:
+            if extension not in enabled_extensions:
+                self._unlink(path + extension)
+
+        for extension, compress in compressors:
+            compressed_path = path + extension
+
+            if not is_changed and self._is_up_to_date(compressed_path, path):
+                continue
+
+            if data is None:
+                with open(path, 'rb') as f:
+                    data = f.read()
+
+            temp_path = '{}.papier-tmp'.format(compressed_path)
+
+            with open(temp_path, 'wb') as f:
+                f.write(compress(data))
+
+            os.replace(temp_path, compressed_path)
+
+            with self._lock:
+                self.compressed_count += 1
+
+    def _unlink(self, path):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    def _is_up_to_date(self, compressed_path, path):
+        try:
+            return os.stat(compressed_path).st_mtime_ns >= os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+
+    def _clone(self, src_path, path):
+        if not fcntl:
+            return False
+
+        try:
+            with open(src_path, 'rb') as src, open(path, 'wb') as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            if os.path.exists(path):
+                os.unlink(path)
+
+            return False
+
+        return True
+
+    def _link(self, src_path, path):
+        if not self.hardlinks:
+            return False
+
+        try:
+            os.link(src_path, path)
+        except OSError:
+            return False
+
+        return True
+
+    def _is_identical_file(self, src_path, path, digest):
+        try:
+            if os.path.samefile(src_path, path):
+                return True
+
+            if os.path.getsize(src_path) != os.path.getsize(path):
+                return False
+        except FileNotFoundError:
+            return False
+
+        return digest_file(path) == digest
+
+    def _is_identical(self, path, data):
+        try:
+            if os.path.getsize(path) != len(data):
+                return False
+
+            with open(path, 'rb') as f:
+                return f.read() == data
+        except FileNotFoundError:
+            return False
@@ -0,0 +1,199 @@
+import os
+import threading
+
+from .assembler  import is_duplicate
+from .content    import MemoryContentStore
+from .dependency import DependencyRecorder
+from .doctree    import DocNode
+from .manifest   import BuildManifest, MANIFEST_FILENAME
+
+
+class PreviewSite(object):
+    """ Preview Site
+
+        Keep the doc tree and the rendered pages in memory and render a page
+        only when it is requested. The sources are interpreted on demand too,
+        unless the interpretation cache of the last build is still valid.
+        Nothing is written to the disk.
+
+        :param assembler: the assembler providing the build components
+        :param config:    the site configuration
+    """
+    def __init__(self, assembler, config):
+        self.assembler     = assembler
+        self.config        = config
+        self.content_store = MemoryContentStore(config.build.content_budget)
+
+        self._lock        = threading.RLock()
+        self._fs_nodes    = {}     # reference path -> FSNode
+        self._doc_nodes   = {}     # reference path -> DocNode
+        self._interpreted = set()  # reference paths
+        self._pages       = {}     # reference path -> (html, dependencies)
+        self._search      = None   # file name -> content of the search index, built on demand
+
+    def load(self):
+        """ Walk the source and build the doc tree """
+        config      = self.config
+        interpreter = self.assembler.interpreter
+        fs_nodes    = self.assembler.file_walker.walk(
+            config.source.path,
+            config.output.path,
+            include = config.source.include,
+            exclude = config.source.exclude,
+        )
+
+        # The manifest is only read to reuse the valid interpretation caches.
+        manifest = BuildManifest.load(os.path.join(
+            os.path.abspath(config.source.path),
+            '.papier-cache',
+            MANIFEST_FILENAME,
+        ))
+
+        with self._lock:
+            self.assembler.rendering_engine.reset()
+            self.assembler.rendering_engine.configure(config)
+            self.content_store.clear()
+
+            # The preview never writes to the source directory.
+            interpreter.configure(config, persistent = False)
+            interpreter.prepare(fs_nodes)
+
+            fs_nodes_by_key = {}
+            fs_nodes        = [fs_node for fs_node in fs_nodes if not is_duplicate(fs_node, fs_nodes_by_key)]
+
+            self._interpreted = set()
+            self._pages       = {}
+            self._search      = None
+
+            for fs_node in fs_nodes:
+                fs_node.content_store = self.content_store
+
+                if fs_node.interpreter and manifest.is_interpreted(fs_node):
+                    manifest.restore_interpretation(fs_node)
+
+                    self._interpreted.add(fs_node.reference_path)
+
+            self._fs_nodes  = {fs_node.reference_path: fs_node for fs_node in fs_nodes}
+            self._doc_nodes = {}
+
+            self._index(self.assembler.doctree_factory.make(fs_nodes))
+
+    def find(self, url_path):
+        """ Find the reference path of the page or the file at the URL path, ``None`` if not found """
+        path = url_path.lstrip('/')
+
+        if not path or path.endswith('/'):
+            path += 'index.html'
+
+        if path in self._fs_nodes and self._fs_nodes[path].is_file():
+            return path
+
+        return None
+
+    def is_page(self, reference_path):
+        return reference_path in self._doc_nodes
+
+    def get_src_path(self, reference_path):
+        return self._fs_nodes[reference_path].src_path
+
+    def render(self, reference_path):
+        """ Render the page or reuse the page rendered before """
+        with self._lock:
+            if reference_path in self._pages:
+                return self._pages[reference_path][0]
+
+            doc_node = self._doc_nodes[reference_path]
+
+            self._interpret(doc_node.fs_node)
+
+            # The navigation reads the titles of the ancestors.
+            for ancestor in doc_node.ancestors:
+                if 'index' in ancestor and ancestor['index'].fs_node:
+                    self._interpret(ancestor['index'].fs_node)
+
+            with DependencyRecorder() as recorder:
+                html = self.assembler.rendering_engine.render(
+                    doc_node,
+                    self.config.get_theme_config(doc_node.path),
+                )
+
+            self._pages[reference_path] = (html, recorder.dependencies)
+
+            return html
+
+    def get_search_file(self, name):
+        """ Get the content of a file of the search index, ``None`` if not found
+
+            The index is built in memory when a file is first requested, which
+            requires every page to be interpreted, and again after a change.
+        """
+        if not self.config.search.enabled:
+            return None
+
+        with self._lock:
+            if self._search is None:
+                fs_nodes = [doc_node.fs_node for doc_node in self._doc_nodes.values()]
+
+                for fs_node in fs_nodes:
+                    self._interpret(fs_node)
+
+                search_indexer = self.assembler.search_indexer
+                self._search   = search_indexer.render(search_indexer.index(fs_nodes))
+
+            return self._search.get(name)
+
+    def invalidate(self, src_paths):
+        """ Forget everything affected by the changed sources
+
+            :return: the reference paths of the invalidated pages and files,
+                     ``None`` if the whole site is reloaded
+        """
+        with self._lock:
+            fs_nodes_by_path = {fs_node.src_path: fs_node for fs_node in self._fs_nodes.values()}
+            changed_paths    = set()
+
+            for src_path in src_paths:
+                fs_node = fs_nodes_by_path.get(os.path.abspath(src_path))
+
+                # Created, deleted or moved entries change the structure of the site.
+                if not fs_node or not os.path.isfile(src_path):
+                    self.load()
+
+                    return None
+
+                self._interpreted.discard(fs_node.reference_path)
+                self.content_store.release(fs_node.cache_path)
+
+                changed_paths.add(fs_node.reference_path)
+
+            self._search = None
+
+            invalidated_paths = {
+                reference_path
+                for reference_path, (_, dependencies) in self._pages.items()
+                if reference_path in changed_paths or not changed_paths.isdisjoint(dependencies)
+            }
+
+            for reference_path in invalidated_paths:
+                del self._pages[reference_path]
+
+            return invalidated_paths | changed_paths
+
+    def _index(self, doc_tree):
+        for node in doc_tree.values():
+            if not isinstance(node, DocNode):
+                self._index(node)
+
+                continue
+
+            if node.interpreter:
+                self._doc_nodes[node.reference_path] = node
+
+    def _interpret(self, fs_node):
+        if fs_node.reference_path in self._interpreted:
+            return
+
+        html = self.assembler.interpreter.interpret(fs_node)
+
+        self.content_store.put(fs_node.cache_path, html)
+        self._interpreted.add(fs_node.reference_path)
@@ -0,0 +1,149 @@
+import codecs
+import heapq
+import json
+import os
+import threading
+import time
+
+from contextlib import nullcontext
+
+DEFAULT_SLOWEST = 10
+
+
+class Profiler(object):
+    """ Profiler
+
+        Record the wall time, the CPU time and the number of calls per stage,
+        and the slowest files per stage (e.g. the interpretation or the
+        rendering of a page).
+
+        .. code-block:: python
+
+            with profiler.stage('walk'):
+                nodes = walker.walk(...)
+
+            profiler.record('render', wall, cpu, path)
+
+            profiler.write_trace('build.trace.json')  # for chrome://tracing
+
+        :param slowest: the number of the slowest files to keep per stage
+    """
+    enabled = True
+
+    def __init__(self, slowest = None):
+        self.slowest     = slowest or DEFAULT_SLOWEST
+        self.started_at  = time.perf_counter()
+        self._stages     = {}  # name -> [count, wall, cpu]
+        self._slowest    = {}  # name -> heap of (wall, path)
+        self._events     = []  # Chrome trace events
+        self._lock       = threading.Lock()
+
+    def stage(self, name):
+        """ Time the block as the stage """
+        return _Stage(self, name)
+
+    def record(self, name, wall, cpu = None, path = None, started_at = None, pid = None):
+        """ Record a call of the stage
+
+            :param started_at: the ``time.perf_counter()`` when the call started
+            :param pid:        the process of the call when made by a worker
+        """
+        with self._lock:
+            stats = self._stages.setdefault(name, [0, 0.0, 0.0])
+
+            stats[0] += 1
+            stats[1] += wall
+            stats[2] += cpu or 0.0
+
+            if path:
+                slowest = self._slowest.setdefault(name, [])
+
+                if len(slowest) < self.slowest:
+                    heapq.heappush(slowest, (wall, path))
+                else:
+                    heapq.heappushpop(slowest, (wall, path))
+
+            self._events.append({
+                'name' : path or name,
+                'cat'  : name,
+                'ph'   : 'X',
+                'ts'   : ((started_at if started_at is not None else time.perf_counter() - wall) - self.started_at) * 1e6,
+                'dur'  : wall * 1e6,
+                'pid'  : pid or os.getpid(),
+                'tid'  : threading.get_ident() if not pid else 0,
+            })
+
+    def report(self):
+        return {
+            'stages'  : {
+                name: {'count': count, 'wall': wall, 'cpu': cpu}
+                for name, (count, wall, cpu) in self._stages.items()
+            },
+            'slowest' : {
+                name: [[path, wall] for wall, path in sorted(slowest, reverse = True)]
+                for name, slowest in self._slowest.items()
+            },
+        }
+
+    def format_report(self):
+        report = self.report()
+        lines  = ['{:<32} {:>8} {:>10} {:>10}'.format('stage', 'count', 'wall', 'cpu')]
+
+        for name, stats in report['stages'].items():
+            lines.append('{:<32} {:>8} {:>9.3f}s {:>9.3f}s'.format(name, stats['count'], stats['wall'], stats['cpu']))
+
+        for name, slowest in report['slowest'].items():
+            lines.append('')
+            lines.append('slowest ({}):'.format(name))
+            lines.extend('  {:>9.3f}s  {}'.format(wall, path) for path, wall in slowest)
+
+        return '\n'.join(lines)
+
+    def write_json(self, path):
+        with codecs.open(path, 'w', 'utf-8') as f:
+            json.dump(self.report(), f, indent = 4)
+
+    def write_trace(self, path):
+        with codecs.open(path, 'w', 'utf-8') as f:
+            json.dump({'traceEvents': self._events, 'displayTimeUnit': 'ms'}, f)
+
+
+class NullProfiler(object):
+    """ Null Profiler
+
+        The profiler used when the profiling is disabled. Every call is a no-op.
+    """
+    enabled = False
+
+    _null_stage = nullcontext()
+
+    def stage(self, name):
+        return self._null_stage
+
+    def record(self, name, wall, cpu = None, path = None, started_at = None, pid = None):
+        pass
+
+
+class _Stage(object):
+    __slots__ = ('profiler', 'name', 'started_at', 'cpu_started_at')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name     = name
+
+    def __enter__(self):
+        self.started_at     = time.perf_counter()
+        self.cpu_started_at = time.process_time()
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.record(
+            self.name,
+            time.perf_counter() - self.started_at,
+            time.process_time() - self.cpu_started_at,
+            started_at = self.started_at,
+        )
+
+
+NULL_PROFILER = NullProfiler()
@@ -0,0 +1,115 @@
+import os
+
+from jinja2            import ChoiceLoader, Environment, FileSystemLoader
+from jinja2.exceptions import TemplateNotFound
+
+from .assets   import STATIC_DIRNAME
+from .manifest import digest_text
+
+
+class RenderingEngine(object):
+    """ Rendering Engine
+
+        Resolve and compile each theme layout once per build. A custom theme
+        falls back to the built-in templates for the templates it does not
+        provide (e.g. ``_layout.html``).
+
+        The templates refer to the static files of the theme with
+        ``asset('default.css')``, which gives the path of the published file
+        (see :class:`papier.assets.AssetPipeline`) relative to the page, and to
+        the root of the site with ``root_path``. ``search`` tells whether the
+        search index is published (see :class:`papier.search.SearchIndexer`),
+        ``highlight`` whether the code blocks are highlighted during the build
+        (see :class:`papier.highlight.CodeHighlighter`) and ``prism`` whether
+        Prism is loaded to highlight them in the browser instead.
+
+        :param templates: the environment of the built-in theme
+    """
+    def __init__(self, templates):
+        self.templates     = templates
+        self._environments = {}
+        self._layouts      = {}
+        self._assets       = {}
+        self._variables    = {'search': False, 'highlight': False, 'prism': True}
+
+    def configure(self, config):
+        """ Receive the site configuration before the rendering starts """
+        self._variables = {
+            'search'    : config.search.enabled,
+            'highlight' : config.highlight.enabled,
+            'prism'     : config.highlight.prism,
+        }
+
+    def reset(self):
+        """ Forget the compiled layouts and the published assets, e.g. before a new build """
+        self._environments.clear()
+        self._layouts.clear()
+        self._assets.clear()
+
+    def use_assets(self, assets):
+        """ Use the published paths of the assets per theme path and per name """
+        self._assets = assets
+
+    def get_layout(self, theme_config):
+        key = (theme_config.path, theme_config.layout)
+
+        if key not in self._layouts:
+            self._layouts[key] = self._get_environment(theme_config.path).get_template(
+                self._get_layout_name(theme_config.layout)
+            )
+
+        return self._layouts[key]
+
+    def render(self, node, theme_config):
+        base_path = '../' * node.reference_path.count('/')
+        assets    = self._assets.get(theme_config.path, {})
+
+        return self.get_layout(theme_config).render(
+            page        = node,
+            contexts    = theme_config.contexts,
+            static_path = base_path + STATIC_DIRNAME,
+            root_path   = base_path,
+            asset       = lambda name: base_path + assets.get(name, '{}/{}'.format(STATIC_DIRNAME, name)),
+            **self._variables
+        )
+
+    def get_source(self, theme_config, name):
+        """ Get the source of a file of the theme, ``None`` if it does not exist """
+        environment = self._get_environment(theme_config.path)
+
+        try:
+            return environment.loader.get_source(environment, name)[0]
+        except TemplateNotFound:
+            return None
+
+    def template_digests(self, config):
+        """ Digest every template of every theme used by the site """
+        theme_paths = {config.theme.path}
+        theme_paths.update(path_config.theme_path for path_config in config.override)
+
+        digests = {}
+
+        for theme_path in sorted(theme_paths, key = lambda path: path or ''):
+            environment = self._get_environment(theme_path)
+
+            for name in environment.list_templates():
+                source = environment.loader.get_source(environment, name)[0]
+
+                digests['{}:{}'.format(theme_path or '', name)] = digest_text(source)
+
+        return digests
+
+    def _get_environment(self, theme_path):
+        if not theme_path:
+            return self.templates
+
+        if theme_path not in self._environments:
+            self._environments[theme_path] = Environment(loader = ChoiceLoader([
+                FileSystemLoader(theme_path),
+                self.templates.loader,
+            ]))
+
+        return self._environments[theme_path]
+
+    def _get_layout_name(self, layout):
+        return layout if os.path.splitext(layout)[1] else '{}.html'.format(layout)
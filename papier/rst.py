@@ -11,15 +11,18 @@
     * the code is primarily for Python 3.4 and 3.5.
 """
 import codecs
-import re
+import copy
 
-from docutils import nodes
-from docutils.parsers.rst import directives, roles
+from docutils import frontend, nodes
+from docutils.parsers.rst import directives, roles, Parser
 from docutils.parsers.rst.directives.body import CodeBlock
 from docutils.core import publish_parts
+from docutils.readers.standalone import Reader
+from docutils.utils import DependencyList
 from docutils.writers.html4css1 import Writer, HTMLTranslator
 
 from .interpreter import Handler
+from .links       import rewrite_source_link
 
 SETTINGS = {
     'cloak_email_addresses'  : False,
@@ -55,6 +58,13 @@ class GitHubHTMLTranslator(HTMLTranslator):
     def depart_section(self, node):
         self.section_level -= 1
 
+    # point the links to the source documents to their pages
+    def visit_reference(self, node):
+        if 'refuri' in node:
+            node['refuri'] = rewrite_source_link(node['refuri'])
+
+        HTMLTranslator.visit_reference(self, node)
+
     def visit_literal_block(self, node):
         classes = node.attributes['classes']
         if len(classes) >= 2 and classes[0] == 'code':
@@ -119,7 +129,16 @@ class DoctestDirective(CodeBlock):
 
 
 class RSTService(object):
+    """ Convert RST to HTML
+
+        The reader, the parser, the writer and the settings are prepared once
+        and reused for every document. Each document gets its own copy of the
+        settings as the publisher alters them. The service is not thread-safe;
+        use one service per thread or process.
+    """
     def __init__(self):
+        self.reader = Reader()
+        self.parser = Parser()
         self.writer = Writer()
         self.writer.translator_class = GitHubHTMLTranslator
 
@@ -128,11 +147,32 @@ class RSTService(object):
         # Render source code in Sphinx doctest blocks
         directives.register_directive('doctest', DoctestDirective)
 
+        self.settings = self._make_settings()
+
+    def _make_settings(self):
+        if hasattr(frontend, 'get_default_settings'):
+            settings = frontend.get_default_settings(self.parser, self.reader, self.writer)
+        else:
+            settings = frontend.OptionParser(components = (self.parser, self.reader, self.writer)).get_default_values()
+
+        for name, value in SETTINGS.items():
+            setattr(settings, name, value)
+
+        # Propagate the exceptions as publish_parts() does without the prepared settings.
+        settings.traceback = True
+
+        return settings
+
     def to_html(self, text : str):
+        settings = copy.copy(self.settings)
+        settings.record_dependencies = DependencyList()
+
         parts = publish_parts(
             text,
-            writer = self.writer,
-            settings_overrides = SETTINGS
+            reader   = self.reader,
+            parser   = self.parser,
+            writer   = self.writer,
+            settings = settings,
         )
 
         if 'html_body' in parts:
@@ -148,19 +188,31 @@ class RSTService(object):
         return ''
 
 
-class RSTHandler(object):
+class RSTHandler(Handler):
+    version    = '2'
+    extensions = ('.rst',)
+
     def __init__(self):
-        self._re_supported_ext = re.compile('\.rst$', re.I)
-        self._service          = RSTService()
+        self._service = None
 
-    def can_handle(self, fs_node):
-        return (
-            fs_node.is_file() and
-            bool(self._re_supported_ext.search(fs_node.reference_path))
-        )
+    def __getstate__(self):
+        # The service is rebuilt in each worker process so that the custom
+        # roles and directives are registered there too.
+        state = dict(self.__dict__)
+
+        state['_service'] = None
+
+        return state
+
+    @property
+    def service(self):
+        if not self._service:
+            self._service = RSTService()
+
+        return self._service
 
     def process(self, fs_node):
         with codecs.open(fs_node.src_path, 'r') as f:
             text = f.read()
 
-        return self._service.to_html(text)
+        return self.highlight(self.service.to_html(text))
@@ -0,0 +1,191 @@
+import os
+
+
+class RenderScheduler(object):
+    """ Render Scheduler
+
+        Tell which pages can be rendered while the other pages are still being
+        interpreted, so that the rendering overlaps with the interpretation.
+
+        A page is rendered once it is interpreted and its navigation (the titles
+        and the paths of its ancestors) is known, i.e. once the index pages of
+        its ancestors are interpreted too. A page which reads the title or the
+        path of another page still being interpreted (e.g. with a custom theme)
+        is postponed until that page is interpreted.
+
+        With the build manifest, an unchanged page is only skipped once every
+        node it depended on in the previous build can no longer change, i.e.
+        these nodes are interpreted and, for a directory, its new pages too.
+
+        .. code-block:: python
+
+            scheduler = RenderScheduler(fs_nodes, pending_keys, manifest)
+
+            for page in scheduler.start(pages):
+                render(page)
+
+            for fs_node in batch.results():
+                for page in scheduler.settle(fs_node.reference_path):
+                    render(page)
+
+        where ``render`` calls :meth:`postpone` with the dependencies recorded
+        while rendering the page and discards the page if it is postponed.
+
+        In a shard (see :class:`papier.shard.Shard`), the pages of the other
+        shards are not interpreted unless a page depends on them, in which case
+        they are requested with :meth:`pop_requested_keys` and the page waits
+        for them like for any other page being interpreted.
+
+        :param fs_nodes:        every node of the site
+        :param pending_keys:    the reference paths of the nodes being interpreted
+        :param manifest:        the build manifest, ``None`` to render every page
+        :param unresolved_keys: the reference paths of the pages not interpreted
+    """
+    def __init__(self, fs_nodes, pending_keys, manifest = None, unresolved_keys = None):
+        self.manifest = manifest
+
+        self._pending    = set(pending_keys)
+        self._unresolved = set(unresolved_keys or ())
+        self._requested  = []     # the unresolved pages to interpret
+        self._dir_keys   = {''}
+        self._index_keys = {}     # directory key -> reference path of its index page
+        self._new_keys   = {}     # directory key -> the new pages being interpreted
+        self._waiting    = {}     # reference path being interpreted -> the pages waiting for it
+        self._decided    = set()  # the pages to render regardless of the manifest
+
+        for fs_node in fs_nodes:
+            key = fs_node.reference_path
+
+            if fs_node.is_dir():
+                self._dir_keys.add(key)
+
+                continue
+
+            dir_key = os.path.dirname(key)
+
+            if fs_node.is_index():
+                self._index_keys[dir_key] = key
+
+            if key in self._pending and not (manifest and key in manifest.entries):
+                self._new_keys.setdefault(dir_key, set()).add(key)
+
+    def start(self, pages):
+        """ Yield the pages which can be rendered now
+
+            :param pages: the doc nodes of the pages in the rendering order
+        """
+        for page in pages:
+            yield from self._schedule(page)
+
+    def settle(self, key):
+        """ Yield the pages which can be rendered once the node is interpreted """
+        self._pending.discard(key)
+
+        new_keys = self._new_keys.get(os.path.dirname(key))
+
+        if new_keys:
+            new_keys.discard(key)
+
+        for page in self._waiting.pop(key, ()):
+            yield from self._schedule(page)
+
+    def pop_requested_keys(self):
+        """ Get the reference paths of the unresolved pages to interpret from now on """
+        requested_keys  = self._requested
+        self._requested = []
+
+        return requested_keys
+
+    def postpone(self, page, dependencies):
+        """ Postpone the rendered page if it depends on a node still being interpreted
+
+            :param dependencies: the dependencies recorded while rendering the page
+            :return: whether the page is postponed
+        """
+        blocking_key = self._get_blocking_key(dependencies, False)
+
+        if blocking_key is None:
+            return False
+
+        self._decided.add(page.reference_path)
+        self._wait(blocking_key, page)
+
+        return True
+
+    def _schedule(self, page):
+        key = page.reference_path
+
+        if key in self._pending:
+            self._wait(key, page)
+
+            return
+
+        blocking_key = self._get_blocking_key(self._get_ancestor_keys(key), False)
+
+        if blocking_key is not None:
+            self._wait(blocking_key, page)
+
+            return
+
+        manifest = self.manifest
+
+        if manifest and key not in self._decided:
+            entry = manifest.entries.get(key)
+
+            if entry and key not in manifest.changed:
+                blocking_key = self._get_blocking_key(entry.get('depends', ()), True)
+
+                if blocking_key is not None:
+                    self._wait(blocking_key, page)
+
+                    return
+
+            if not manifest.needs_rendering(page.fs_node):
+                return
+
+            self._decided.add(key)
+
+        yield page
+
+    def _get_blocking_key(self, keys, is_structural):
+        """ Get the node being interpreted which the keys depend on
+
+            :param is_structural: whether adding a page to a directory affects the directory
+        """
+        for key in keys:
+            if key in self._unresolved:
+                self._unresolved.discard(key)
+                self._pending.add(key)
+                self._requested.append(key)
+
+                return key
+
+            if key not in self._dir_keys:
+                if key in self._pending:
+                    return key
+
+                continue
+
+            index_key = self._index_keys.get(key)
+
+            if index_key in self._pending:
+                return index_key
+
+            if is_structural and self._new_keys.get(key):
+                return next(iter(self._new_keys[key]))
+
+        return None
+
+    def _get_ancestor_keys(self, key):
+        dir_key       = os.path.dirname(key)
+        ancestor_keys = ['']
+
+        while dir_key:
+            ancestor_keys.append(dir_key)
+
+            dir_key = os.path.dirname(dir_key)
+
+        return ancestor_keys
+
+    def _wait(self, key, page):
+        self._waiting.setdefault(key, []).append(page)
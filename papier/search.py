@@ -0,0 +1,333 @@
+import codecs
+import html
+import json
+import os
+import re
+
+from .manifest import digest_text, file_stat
+
+SEARCH_DIRNAME = '_search'
+INDEX_FILENAME = 'index.json'
+STATE_FILENAME = 'search.json'
+TITLE_WEIGHT   = 10  # the weight of a term in the title relative to the body
+SHARD_KEY_SIZE = 2   # the number of leading characters of the terms in a shard
+
+_re_invisible = re.compile(r'<(script|style)\b[^>]*>.*?</\1\s*>', re.S | re.I)
+_re_tag       = re.compile(r'<[^>]*>')
+_re_term      = re.compile(r'\w{2,}')
+
+
+def extract_text(content):
+    """ Extract the visible text from the HTML """
+    return html.unescape(_re_tag.sub(' ', _re_invisible.sub(' ', content)))
+
+
+def extract_terms(text):
+    return _re_term.findall(text.lower())
+
+
+def get_shard_name(term):
+    """ Get the file name (without the extension) of the shard containing the term """
+    return term[:SHARD_KEY_SIZE].encode('utf-8').hex()
+
+
+def encode_terms(terms):
+    """ Front-code the sorted terms into ``[shared prefix length, suffix, ...]`` """
+    encoded  = []
+    previous = ''
+
+    for term in terms:
+        shared_length = 0
+
+        while shared_length < min(len(term), len(previous)) and term[shared_length] == previous[shared_length]:
+            shared_length += 1
+
+        encoded.extend((shared_length, term[shared_length:]))
+
+        previous = term
+
+    return encoded
+
+
+def encode_postings(postings):
+    """ Delta-encode the sorted document IDs into ``[ID delta, weight, ...]`` """
+    encoded     = []
+    previous_id = 0
+
+    for document_id, weight in postings:
+        encoded.extend((document_id - previous_id, weight))
+
+        previous_id = document_id
+
+    return encoded
+
+
+class SearchIndexer(object):
+    """ Search Indexer
+
+        Build an inverted index of the interpreted pages (their titles and
+        their text) and publish it in ``_search`` for ``search.js``:
+
+        * ``_search/index.json`` lists the ``[path, title]`` of the pages by ID
+          and the names of the shards.
+        * ``_search/<hex of the first two characters>.json`` holds the terms
+          starting with these characters, front-coded, and their postings,
+          delta-encoded, so that a browser only fetches the shards of the
+          terms it looks up.
+
+        The terms of every page are kept in ``.papier-cache/search.json`` with
+        the digest of its interpretation cache, so only the changed pages are
+        read again, and only the shards of the terms whose postings changed are
+        rendered again. Nothing is written when no page changed. The page IDs
+        are stable and the shards are written with the output writer, so the
+        unchanged shards are left untouched.
+
+        :param output_writer: the output writer
+    """
+    version = 1
+
+    def __init__(self, output_writer):
+        self.output_writer = output_writer
+        self._states       = {}  # state path -> (file signature, documents), kept for the next builds
+
+    def build(self, config, fs_nodes, manifest = None):
+        documents, changed_terms = self._update(config, fs_nodes, manifest, STATE_FILENAME)
+
+        if not os.path.exists(os.path.join(config.output.path, SEARCH_DIRNAME, INDEX_FILENAME)):
+            self.publish(config, documents)
+        elif changed_terms is not None:
+            self._publish(config, documents, {get_shard_name(term) for term in changed_terms})
+
+    def collect(self, config, fs_nodes, manifest = None, state_filename = None):
+        """ Update the documents of the pages without publishing the index (e.g. in a build shard)
+
+            :param state_filename: the name of the file keeping the documents in ``.papier-cache``
+            :return: the documents per reference path
+        """
+        return self._update(config, fs_nodes, manifest, state_filename or STATE_FILENAME)[0]
+
+    def publish(self, config, documents):
+        """ Publish the index of the documents (e.g. merged from the build shards) """
+        self._publish(config, documents, None, self._get_published_shard_names(config))
+
+    def _update(self, config, fs_nodes, manifest, state_filename):
+        """ Index the changed pages
+
+            :return: the documents per reference path and the terms whose
+                     postings changed, ``None`` if no document changed
+        """
+        src_path   = os.path.abspath(config.source.path)
+        state_path = os.path.join(src_path, '.papier-cache', state_filename)
+
+        # The documents of the previous build unless the state was changed by another build
+        state_stat, documents = self._states.get(state_path, (None, None))
+
+        if documents is None or state_stat != file_stat(state_path):
+            documents = self._load(state_path)
+
+        self._states[state_path] = (file_stat(state_path), documents)
+
+        changed_terms = set()
+        is_changed    = False
+
+        pages = {fs_node.reference_path: fs_node for fs_node in fs_nodes if fs_node.interpreter}
+
+        for reference_path in set(documents) - set(pages):
+            changed_terms.update(documents.pop(reference_path)['terms'])
+
+            is_changed = True
+
+        used_ids = {document['id'] for document in documents.values()}
+        next_id  = 0
+
+        for reference_path in sorted(pages):
+            fs_node  = pages[reference_path]
+            document = documents.get(reference_path)
+            digest   = self._get_digest(fs_node, manifest)
+
+            if document and document['digest'] == digest:
+                continue
+
+            if not document:
+                # Reuse the IDs of the removed pages first.
+                while next_id in used_ids:
+                    next_id += 1
+
+                document = documents[reference_path] = {'id': next_id, 'terms': {}}
+
+                used_ids.add(next_id)
+
+            previous_terms = document['terms']
+
+            document.update(self._index(fs_node))
+            document['digest'] = digest
+
+            changed_terms.update(
+                term
+                for term in previous_terms.keys() | document['terms'].keys()
+                if previous_terms.get(term) != document['terms'].get(term)
+            )
+
+            is_changed = True
+
+            fs_node.release_content()
+
+        if not is_changed:
+            return documents, None
+
+        self._save(state_path, documents)
+
+        self._states[state_path] = (file_stat(state_path), documents)
+
+        return documents, changed_terms
+
+    def _index(self, fs_node):
+        title = ' '.join(extract_text(fs_node.title or '').split())
+        terms = {}
+
+        for term in extract_terms(extract_text(fs_node.content)):
+            terms[term] = terms.get(term, 0) + 1
+
+        for term in extract_terms(title):
+            terms[term] = terms.get(term, 0) + TITLE_WEIGHT
+
+        return {'title': title, 'terms': terms}
+
+    def index(self, fs_nodes):
+        """ Index the pages without the state of the previous builds (e.g. in the preview)
+
+            :return: the documents per reference path, with the IDs given in the order of the paths
+        """
+        pages     = sorted(
+            (fs_node for fs_node in fs_nodes if fs_node.interpreter),
+            key = lambda fs_node: fs_node.reference_path,
+        )
+        documents = {}
+
+        for document_id, fs_node in enumerate(pages):
+            documents[fs_node.reference_path] = dict(self._index(fs_node), id = document_id)
+
+        return documents
+
+    def render(self, documents, shard_names = None):
+        """ Render the files of the index of the documents
+
+            :param shard_names: the names of the shards to render, ``None`` for every shard
+            :return: the content of the files per name in ``_search``
+        """
+        shards = {}  # shard name -> term -> [(document ID, weight)]
+
+        for document in documents.values():
+            for term, weight in document['terms'].items():
+                shard_name = get_shard_name(term)
+
+                if shard_names is None or shard_name in shard_names:
+                    shards.setdefault(shard_name, {}).setdefault(term, []).append((document['id'], weight))
+                else:
+                    shards.setdefault(shard_name, None)
+
+        files = {}
+
+        for shard_name, postings in shards.items():
+            if postings is None:
+                continue
+
+            terms = sorted(postings)
+
+            files['{}.json'.format(shard_name)] = json.dumps(
+                {
+                    'terms'    : encode_terms(terms),
+                    'postings' : [encode_postings(sorted(postings[term])) for term in terms],
+                },
+                ensure_ascii = False,
+                separators   = (',', ':'),
+            )
+
+        pages = [None] * (max([document['id'] for document in documents.values()], default = -1) + 1)
+
+        for reference_path, document in documents.items():
+            pages[document['id']] = [reference_path, document['title']]
+
+        files[INDEX_FILENAME] = json.dumps(
+            {
+                'version' : self.version,
+                'pages'   : pages,
+                'shards'  : sorted(shards),
+            },
+            ensure_ascii = False,
+            separators   = (',', ':'),
+        )
+
+        return files
+
+    def _publish(self, config, documents, shard_names = None, previous_shard_names = None):
+        """ Publish the index and the shards
+
+            :param shard_names:          the names of the shards to publish, ``None`` for every shard
+            :param previous_shard_names: the names of the shards published before, to remove when empty
+        """
+        output_path = os.path.join(config.output.path, SEARCH_DIRNAME)
+        files       = self.render(documents, shard_names)
+
+        for name, content in files.items():
+            self.output_writer.write(os.path.join(output_path, name), content)
+
+        for shard_name in shard_names if shard_names is not None else previous_shard_names:
+            if '{}.json'.format(shard_name) in files:
+                continue
+
+            shard_path = os.path.join(output_path, '{}.json'.format(shard_name))
+
+            if os.path.exists(shard_path):
+                os.unlink(shard_path)
+
+    def _get_digest(self, fs_node, manifest):
+        entry = manifest.entries.get(fs_node.reference_path) if manifest else None
+
+        if entry and 'cache' in entry:
+            return entry['cache'][0]
+
+        return digest_text(fs_node.content)
+
+    def _get_published_shard_names(self, config):
+        index_path = os.path.join(config.output.path, SEARCH_DIRNAME, INDEX_FILENAME)
+
+        if not os.path.exists(index_path):
+            return set()
+
+        try:
+            with codecs.open(index_path, 'r', 'utf-8') as f:
+                return set(json.load(f).get('shards', ()))
+        except ValueError:
+            return set()
+
+    def _load(self, path):
+        if not os.path.exists(path):
+            return {}
+
+        try:
+            with open(path, 'r', encoding = 'utf-8') as f:
+                data = json.loads(f.read())
+        except ValueError:
+            return {}
+
+        if data.get('version') != self.version:
+            return {}
+
+        return data['documents']
+
+    def _save(self, path, documents):
+        dir_path = os.path.dirname(path)
+
+        if not os.path.exists(dir_path):
+            os.makedirs(dir_path, 0o755)
+
+        temp_path = '{}.tmp'.format(path)
+
+        # Serialized at once, which is much faster than streaming it to the file.
+        content = json.dumps({'version': self.version, 'documents': documents}, ensure_ascii = False)
+
+        with open(temp_path, 'w', encoding = 'utf-8') as f:
+            f.write(content)
+
+        os.replace(temp_path, path)
@@ -0,0 +1,181 @@
+import asyncio
+import json
+import mimetypes
+import os
+
+from urllib.parse import unquote, urlsplit
+
+from .highlight import STYLESHEET_FILENAME as HIGHLIGHT_STYLESHEET_FILENAME, get_stylesheet
+from .search    import SEARCH_DIRNAME
+
+EVENTS_PATH  = '/__papier__/events'
+STATUS_NAMES = {
+    200: 'OK',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    500: 'Internal Server Error',
+}
+
+RELOAD_SCRIPT = '''<script>
+(function () {
+    var source = new EventSource('%s');
+
+    source.onmessage = function (event) {
+        var paths   = JSON.parse(event.data);
+        var current = location.pathname.replace(/^\\//, '').replace(/(^|\\/)$/, '$1index.html');
+
+        if (paths === null || paths.indexOf(current) >= 0) {
+            location.reload();
+        }
+    };
+})();
+</script>
+''' % EVENTS_PATH
+
+
+class PreviewServer(object):
+    """ Preview Server
+
+        Serve a :class:`papier.preview.PreviewSite` over HTTP with asyncio and
+        push the reload notifications to the open pages with server-sent events.
+
+        :param site: the preview site
+        :param host: the host to listen on
+        :param port: the port to listen on
+    """
+    def __init__(self, site, host = None, port = None):
+        self.site = site
+        self.host = host or '127.0.0.1'
+        self.port = port or 8000
+
+        self._loop        = None
+        self._subscribers = set()
+
+    async def serve_forever(self):
+        self._loop = asyncio.get_running_loop()
+
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+
+        async with server:
+            await server.serve_forever()
+
+    def notify(self, reference_paths):
+        """ Tell the open pages to reload (thread-safe)
+
+            :param reference_paths: the reference paths of the invalidated pages,
+                                    ``None`` to reload every page
+        """
+        if not self._loop:
+            return
+
+        message = json.dumps(sorted(reference_paths) if reference_paths is not None else None)
+
+        self._loop.call_soon_threadsafe(self._broadcast, message)
+
+    def _broadcast(self, message):
+        for queue in self._subscribers:
+            queue.put_nowait(message)
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+
+            # Skip the headers.
+            while (await reader.readline()).strip():
+                pass
+
+            if len(request_line) < 2 or request_line[0] not in ('GET', 'HEAD'):
+                self._respond(writer, 405, 'text/plain', b'Method Not Allowed')
+
+                return
+
+            path = unquote(urlsplit(request_line[1]).path)
+
+            if path == EVENTS_PATH:
+                await self._stream_events(writer)
+
+                return
+
+            try:
+                status, content_type, body = await self._loop.run_in_executor(None, self._get, path)
+            except Exception as e:
+                status, content_type, body = 500, 'text/plain', '{}: {}'.format(type(e).__name__, e).encode('utf-8')
+
+            self._respond(writer, status, content_type, body if request_line[0] == 'GET' else b'')
+
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _stream_events(self, writer):
+        queue = asyncio.Queue()
+
+        self._subscribers.add(queue)
+
+        try:
+            writer.write(
+                b'HTTP/1.1 200 OK\r\n'
+                b'Content-Type: text/event-stream\r\n'
+                b'Cache-Control: no-cache\r\n'
+                b'\r\n'
+            )
+
+            await writer.drain()
+
+            while True:
+                message = await queue.get()
+
+                writer.write('data: {}\n\n'.format(message).encode('utf-8'))
+
+                await writer.drain()
+        finally:
+            self._subscribers.discard(queue)
+
+    def _get(self, path):
+        reference_path = self.site.find(path)
+
+        if reference_path and self.site.is_page(reference_path):
+            html = self.site.render(reference_path)
+            html = html.replace('</body>', '{}</body>'.format(RELOAD_SCRIPT), 1)
+
+            return 200, 'text/html; charset=utf-8', html.encode('utf-8')
+
+        if reference_path:
+            with open(self.site.get_src_path(reference_path), 'rb') as f:
+                return 200, self._guess_type(path), f.read()
+
+        # Fall back to the search index and to the static files of the theme.
+        name = os.path.basename(path)
+
+        if path == '/{}/{}'.format(SEARCH_DIRNAME, name):
+            content = self.site.get_search_file(name)
+
+            if content is not None:
+                return 200, 'application/json; charset=utf-8', content.encode('utf-8')
+
+        if name == HIGHLIGHT_STYLESHEET_FILENAME and self.site.config.highlight.enabled:
+            return 200, 'text/css', get_stylesheet(self.site.config.highlight.style).encode('utf-8')
+
+        if name and not name.startswith('_') and not name.endswith('.html'):
+            source = self.site.assembler.rendering_engine.get_source(self.site.config.theme, name)
+
+            if source is not None:
+                return 200, self._guess_type(path), source.encode('utf-8')
+
+        return 404, 'text/plain', b'Not Found'
+
+    def _guess_type(self, path):
+        return mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    def _respond(self, writer, status, content_type, body):
+        writer.write(
+            'HTTP/1.1 {} {}\r\nContent-Type: {}\r\nContent-Length: {}\r\nConnection: close\r\n\r\n'.format(
+                status,
+                STATUS_NAMES[status],
+                content_type,
+                len(body),
+            ).encode('latin-1')
+        )
+        writer.write(body)
@@ -0,0 +1,230 @@
+import hashlib
+import json
+import os
+import re
+
+from .compression import COMPRESSED_EXTENSIONS, COMPRESSIBLE_EXTENSIONS
+from .manifest    import BuildManifest, MANIFEST_FILENAME, digest_file, file_stat
+
+STATE_FILENAME = '.papier-shard.json'
+
+_re_shard = re.compile(r'^\s*(?P<index>\d+)\s*/\s*(?P<count>\d+)\s*$')
+
+
+class InvalidShardError(ValueError):
+    """ Invalid Shard """
+
+
+class ShardMergeError(RuntimeError):
+    """ Shard Merge Error """
+
+
+class Shard(object):
+    """ Shard
+
+        One of ``count`` deterministic partitions of the source tree. A node
+        belongs to the shard chosen by the digest of its reference path, so
+        every machine agrees on the partition without any coordination and
+        adding a page never moves the other pages to another shard.
+
+        A shard builds its pages into ``<output path>.shard-<index>-of-<count>``
+        together with its state (see :func:`save_state`), which
+        :class:`ShardMerger` combines into the output path.
+
+        :param index: the number of the shard, from 1 to ``count``
+        :param count: the number of shards
+    """
+    def __init__(self, index, count):
+        if count < 1 or not 1 <= index <= count:
+            raise InvalidShardError('Invalid shard: {}/{}'.format(index, count))
+
+        self.index = index
+        self.count = count
+
+    @staticmethod
+    def parse(text):
+        """ Parse the shard from ``"<index>/<count>"``, e.g. ``"2/4"`` """
+        matches = _re_shard.search(text)
+
+        if not matches:
+            raise InvalidShardError('Invalid shard: {} (expected: <index>/<count>, e.g. 2/4)'.format(text))
+
+        return Shard(int(matches.group('index')), int(matches.group('count')))
+
+    @property
+    def name(self):
+        return 'shard-{}-of-{}'.format(self.index, self.count)
+
+    def owns(self, reference_path):
+        digest = hashlib.sha1(reference_path.encode('utf-8')).digest()
+
+        return int.from_bytes(digest[:8], 'big') % self.count == self.index - 1
+
+    def get_output_path(self, output_path):
+        return '{}.{}'.format(os.path.abspath(output_path), self.name)
+
+    def get_cache_filename(self, filename):
+        """ Get the name of a file of ``.papier-cache`` used by this shard only """
+        base_name, extension = os.path.splitext(filename)
+
+        return '{}.{}{}'.format(base_name, self.name, extension)
+
+    def __repr__(self):
+        return '<Shard {}/{}>'.format(self.index, self.count)
+
+
+def save_state(shard, output_path, fingerprint, entries, documents = None):
+    """ Save the state of the shard needed by the merge in its output
+
+        :param fingerprint: the digest of the configuration and the templates
+        :param entries:     the manifest entries of the nodes of the shard
+        :param documents:   the search documents of the pages of the shard, ``None`` without the search
+    """
+    path      = os.path.join(output_path, STATE_FILENAME)
+    temp_path = '{}.tmp'.format(path)
+
+    os.makedirs(output_path, 0o755, exist_ok = True)
+
+    # Serialized at once, which is much faster than streaming it to the file.
+    content = json.dumps(
+        {
+            'shard'       : [shard.index, shard.count],
+            'fingerprint' : fingerprint,
+            'entries'     : entries,
+            'documents'   : documents,
+        },
+        sort_keys = True,
+    )
+
+    with open(temp_path, 'w', encoding = 'utf-8') as f:
+        f.write(content)
+
+    os.replace(temp_path, path)
+
+
+def load_state(output_path):
+    path = os.path.join(output_path, STATE_FILENAME)
+
+    if not os.path.exists(path):
+        raise ShardMergeError('The shard is not built: {}'.format(output_path))
+
+    with open(path, 'r', encoding = 'utf-8') as f:
+        return json.loads(f.read())
+
+
+class ShardMerger(object):
+    """ Shard Merger
+
+        Combine the outputs of the shards into the output path. Every shard
+        must be built with the same configuration and templates. The files are
+        published with the output writer, so they are hard-linked when allowed
+        and the unchanged files are left untouched. The search index is built
+        again from the search documents of every shard and the manifest entries
+        of every shard are combined into the build manifest of the site. The
+        outputs of the sources deleted since the previous merge are removed.
+
+        :param output_writer:  the output writer
+        :param search_indexer: the search indexer
+    """
+    def __init__(self, output_writer, search_indexer):
+        self.output_writer  = output_writer
+        self.search_indexer = search_indexer
+
+    def merge(self, config, count):
+        """ Merge the outputs of the ``count`` shards
+
+            :return: the number of merged files
+        """
+        states       = []
+        shard_paths  = []
+        fingerprints = set()
+
+        for index in range(1, count + 1):
+            shard_path = Shard(index, count).get_output_path(config.output.path)
+            state      = load_state(shard_path)
+
+            if state['shard'] != [index, count]:
+                raise ShardMergeError('Unexpected shard {}/{} in {}'.format(*state['shard'], shard_path))
+
+            states.append(state)
+            shard_paths.append(shard_path)
+            fingerprints.add(state['fingerprint'])
+
+        if len(fingerprints) > 1:
+            raise ShardMergeError('The shards are built with different configurations or templates.')
+
+        output_path = os.path.abspath(config.output.path)
+        digests     = {}  # relative path -> digest of the merged file
+
+        self.output_writer.hardlinks   = config.output.hardlinks
+        self.output_writer.compression = config.output.compression
+
+        with self.output_writer:
+            for shard_path in shard_paths:
+                self._merge_files(shard_path, output_path, digests)
+
+            if config.search.enabled:
+                self.search_indexer.publish(config, self._merge_documents(states))
+
+        manifest_path = os.path.join(os.path.abspath(config.source.path), '.papier-cache', MANIFEST_FILENAME)
+        manifest      = BuildManifest(manifest_path, fingerprints.pop())
+
+        for state in states:
+            for reference_path, entry in state['entries'].items():
+                if 'output' in entry:
+                    entry['output'][1] = file_stat(os.path.join(output_path, reference_path))
+
+                manifest.entries[reference_path] = entry
+
+        # The outputs of the sources deleted since the previous build or merge
+        for reference_path in sorted(set(BuildManifest.load(manifest_path).entries) - set(manifest.entries)):
+            self.output_writer.remove(os.path.join(output_path, reference_path), output_path)
+
+        manifest.save()
+
+        return len(digests)
+
+    def _merge_files(self, shard_path, output_path, digests):
+        for dir_path, dir_names, file_names in os.walk(shard_path):
+            dir_names.sort()
+
+            for file_name in sorted(file_names):
+                if file_name == STATE_FILENAME and dir_path == shard_path:
+                    continue
+
+                src_path      = os.path.join(dir_path, file_name)
+                relative_path = os.path.relpath(src_path, shard_path)
+                digest        = digest_file(src_path)
+
+                # Every shard publishes the same theme files.
+                if relative_path in digests:
+                    if digests[relative_path] != digest:
+                        raise ShardMergeError('The shards have different versions of {}'.format(relative_path))
+
+                    continue
+
+                digests[relative_path] = digest
+                dest_path              = os.path.join(output_path, relative_path)
+
+                # The pre-compressed siblings are merged with their files.
+                self.output_writer.copy(src_path, dest_path, digest, False)
+
+                if not file_name.endswith(COMPRESSIBLE_EXTENSIONS):
+                    continue
+
+                # The siblings of the formats which the shards no longer write
+                for extension in COMPRESSED_EXTENSIONS:
+                    if not os.path.exists(src_path + extension) and os.path.exists(dest_path + extension):
+                        os.unlink(dest_path + extension)
+
+    def _merge_documents(self, states):
+        documents = {}
+
+        for state in states:
+            documents.update(state['documents'] or {})
+
+        # The page IDs are given again in the order of the paths.
+        for document_id, reference_path in enumerate(sorted(documents)):
+            documents[reference_path]['id'] = document_id
+
+        return documents
@@ -0,0 +1,158 @@
+/**
+ * Papier Search
+ *
+ * Look up the prebuilt index in "_search" (see papier.search.SearchIndexer).
+ * Only the index and the shards of the searched terms are fetched.
+ */
+(function () {
+    var form = document.querySelector('form.search');
+
+    if (!form) {
+        return;
+    }
+
+    var input       = form.querySelector('input');
+    var resultList  = form.querySelector('ol.search-results');
+    var rootPath    = form.getAttribute('data-root');
+    var searchPath  = rootPath + '_search/';
+    var shards      = {};  // shard name -> Promise of {term: [[page ID, weight], ...]}
+    var index       = null;
+
+    function fetchJSON(path) {
+        return fetch(searchPath + path).then(function (response) {
+            return response.ok ? response.json() : null;
+        });
+    }
+
+    function extractTerms(text) {
+        return (text.toLowerCase().match(/[\p{L}\p{N}_]{2,}/gu) || []);
+    }
+
+    function getShardName(term) {
+        var bytes = new TextEncoder().encode(Array.from(term).slice(0, 2).join(''));
+
+        return Array.from(bytes).map(function (byte) {
+            return byte.toString(16).padStart(2, '0');
+        }).join('');
+    }
+
+    function decodeShard(shard) {
+        var postingsByTerm = {};
+        var term           = '';
+
+        for (var i = 0; i < shard.terms.length; i += 2) {
+            term = term.slice(0, shard.terms[i]) + shard.terms[i + 1];
+
+            var postings = [];
+            var encoded  = shard.postings[i / 2];
+            var pageId   = 0;
+
+            for (var j = 0; j < encoded.length; j += 2) {
+                pageId += encoded[j];
+
+                postings.push([pageId, encoded[j + 1]]);
+            }
+
+            postingsByTerm[term] = postings;
+        }
+
+        return postingsByTerm;
+    }
+
+    function loadShard(shardName) {
+        if (!shards[shardName]) {
+            shards[shardName] = index.shards.indexOf(shardName) >= 0
+                ? fetchJSON(shardName + '.json').then(function (shard) { return shard ? decodeShard(shard) : {}; })
+                : Promise.resolve({});
+        }
+
+        return shards[shardName];
+    }
+
+    // The last term is matched as a prefix while typing.
+    function lookUp(term, isPrefix) {
+        return loadShard(getShardName(term)).then(function (postingsByTerm) {
+            var scores = {};
+
+            Object.keys(postingsByTerm).forEach(function (candidate) {
+                if (candidate !== term && !(isPrefix && candidate.indexOf(term) === 0)) {
+                    return;
+                }
+
+                postingsByTerm[candidate].forEach(function (posting) {
+                    scores[posting[0]] = (scores[posting[0]] || 0) + posting[1];
+                });
+            });
+
+            return scores;
+        });
+    }
+
+    function search(query) {
+        var terms = extractTerms(query);
+
+        if (!terms.length) {
+            return Promise.resolve([]);
+        }
+
+        var indexLoaded = index ? Promise.resolve(index) : fetchJSON('index.json').then(function (data) {
+            return index = data || {pages: [], shards: []};
+        });
+
+        return indexLoaded.then(function () {
+            return Promise.all(terms.map(function (term, i) {
+                return lookUp(term, i === terms.length - 1);
+            }));
+        }).then(function (scoresByTerm) {
+            // Only the pages containing every term are kept.
+            var total = scoresByTerm.reduce(function (total, scores) {
+                var merged = {};
+
+                Object.keys(scores).forEach(function (pageId) {
+                    if (total === null || pageId in total) {
+                        merged[pageId] = (total ? total[pageId] : 0) + scores[pageId];
+                    }
+                });
+
+                return merged;
+            }, null);
+
+            return Object.keys(total).sort(function (a, b) {
+                return total[b] - total[a];
+            }).slice(0, 20).map(function (pageId) {
+                return index.pages[pageId];
+            });
+        });
+    }
+
+    function show(pages) {
+        resultList.innerHTML = '';
+
+        pages.forEach(function (page) {
+            var item = document.createElement('li');
+            var link = document.createElement('a');
+
+            link.href        = rootPath + page[0];
+            link.textContent = page[1] || page[0];
+
+            item.appendChild(link);
+            resultList.appendChild(item);
+        });
+    }
+
+    var lastQuery = null;
+
+    input.addEventListener('input', function () {
+        var query = lastQuery = input.value;
+
+        search(query).then(function (pages) {
+            if (query === lastQuery) {
+                show(pages);
+            }
+        });
+    });
+
+    form.addEventListener('submit', function (event) {
+        event.preventDefault();
+    });
+})();
@@ -1,7 +1,10 @@
-import codecs
+import fnmatch
 import os
 import hashlib
 import re
+import sys
+
+from .content import ContentStore
 
 _re_extension = re.compile('\.[^\.]+$')
 
@@ -18,25 +21,41 @@ def hash_cache_name(content):
 
 
 class FSNode(object):
-    def __init__(self, src_path, output_path, reference_path, cache_path, kind):
+    __slots__ = (
+        'src_path',
+        'output_path',
+        'reference_path',
+        'name',
+        'cache_path',
+        'kind',
+        'interpreter',
+        'title',
+        'outline',
+        'content_store',
+    )
+
+    def __init__(self, src_path, output_path, reference_path, cache_path, kind, content_store = None):
         self.src_path       = src_path
         self.output_path    = output_path
-        self.reference_path = reference_path
-        self.name           = _re_extension.sub('', self.reference_path)
+        self.reference_path = sys.intern(reference_path)
+        self.name           = sys.intern(_re_extension.sub('', reference_path))
         self.cache_path     = cache_path
         self.kind           = kind
         self.interpreter    = None
-
-        # Local cache
-        self.__content = None
+        self.title          = None  # extracted during the interpretation
+        self.outline        = None  # extracted during the interpretation
+        self.content_store  = content_store
 
     @property
     def content(self):
-        if not self.__content:
-            with codecs.open(self.cache_path, 'r') as f:
-                self.__content = f.read()
+        if not self.content_store:
+            self.content_store = ContentStore()
+
+        return self.content_store.get(self.cache_path)
 
-        return self.__content
+    def release_content(self):
+        if self.content_store:
+            self.content_store.release(self.cache_path)
 
     def is_file(self):
         return self.kind == 'file'
@@ -44,67 +63,108 @@ class FSNode(object):
     def is_dir(self):
         return self.kind == 'dir'
 
+    def is_index(self):
+        return self.kind == 'file' and os.path.basename(self.name) == 'index'
+
     def interpret(self):
         return self.interpreter.process(self)
 
-    def src_mtime(self):
-        return os.path.getmtime(self.src_path)
-
-    def output_mtime(self):
-        if not os.path.exists(self.output_path):
-            return None
+    def __getstate__(self):
+        """ Leave out the handler and the content store when sent to a worker process. """
+        state = {name: getattr(self, name) for name in self.__slots__}
 
-        return os.path.getmtime(self.output_path)
+        state['interpreter']   = None
+        state['content_store'] = None
 
-    def is_updated(self):
-        output_mtime = self.output_mtime()
-        src_mtime    = self.src_mtime()
+        return state
 
-        return src_mtime < output_mtime if output_mtime else True
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
 
     def __repr__(self):
         return '<FSNode {}="{}">'.format(self.kind, self.reference_path)
 
 
 class FileWalker(object):
-    def walk(self, src_path, output_path, reference_path = None):
+    def __init__(self, content_store = None):
+        self.content_store = content_store or ContentStore()
+
+    def walk(self, src_path, output_path, reference_path = None, include = None, exclude = None):
+        """ List every file and directory under ``src_path`` ordered by the reference path
+
+            :param include: the glob patterns of the files to list (default: all files)
+            :param exclude: the glob patterns of the files and directories to skip
+
+            A pattern is matched against both the name and the path relative to
+            ``reference_path``. Excluded directories are never descended into.
+        """
+        sub_paths = list(self.iterate(src_path, output_path, reference_path, include, exclude))
+
+        sub_paths.sort(key = lambda fs_node: fs_node.reference_path)
+
+        return sub_paths
+
+    def iterate(self, src_path, output_path, reference_path = None, include = None, exclude = None):
+        """ Yield every file and directory under ``src_path`` as soon as it is found
+
+            A directory is always yielded before its content and the entries
+            of a directory are yielded in the order of their names, otherwise
+            the order is unspecified. See :meth:`walk` for the parameters.
+        """
         src_path    = os.path.abspath(src_path)
         output_path = os.path.abspath(output_path)
 
         reference_path  = reference_path or src_path
         base_cache_path = os.path.join(reference_path, '.papier-cache')
         ref_path_offset = len(reference_path) + 1
-        sub_paths       = []
+        re_include      = _compile_globs(include)
+        re_exclude      = _compile_globs(exclude)
+        pending_paths   = [(src_path, output_path)]
 
         if os.path.isfile(src_path):
             raise InvalidWalkTargetError('{} must be a directory.'.format(src_path))
 
-        for name in os.listdir(src_path):
-            if name[0] == '.':
-                continue
+        while pending_paths:
+            dir_src_path, dir_output_path = pending_paths.pop()
 
-            sub_src_path    = os.path.join(src_path, name)
-            sub_output_path = os.path.join(output_path, name)
-            sub_ref_path    = sub_src_path[ref_path_offset:]
-            sub_cache_path  = os.path.join(base_cache_path, hash_cache_name(sub_ref_path))
+            with os.scandir(dir_src_path) as entries:
+                for entry in sorted(entries, key = lambda entry: entry.name):
+                    name = entry.name
 
-            sub_paths.append(FSNode(
-                sub_src_path,
-                sub_output_path,
-                sub_ref_path,
-                sub_cache_path,
-                'dir' if os.path.isdir(sub_src_path) else 'file'
-            ))
+                    if name[0] == '.':
+                        continue
 
-            if os.path.isdir(sub_src_path):
-                sub_paths.extend(self.walk(
-                    sub_src_path,
-                    sub_output_path,
-                    reference_path
-                ))
+                    sub_src_path = entry.path
+                    sub_ref_path = sub_src_path[ref_path_offset:]
 
-                continue
+                    if re_exclude and (re_exclude.match(name) or re_exclude.match(sub_ref_path)):
+                        continue
 
-        sub_paths.sort(key = lambda fs_node: fs_node.reference_path)
+                    sub_output_path = os.path.join(dir_output_path, name)
 
-        return sub_paths
+                    if entry.is_dir():
+                        yield FSNode(sub_src_path, sub_output_path, sub_ref_path, None, 'dir', self.content_store)
+
+                        pending_paths.append((sub_src_path, sub_output_path))
+
+                        continue
+
+                    if re_include and not (re_include.match(name) or re_include.match(sub_ref_path)):
+                        continue
+
+                    yield FSNode(
+                        sub_src_path,
+                        sub_output_path,
+                        sub_ref_path,
+                        os.path.join(base_cache_path, hash_cache_name(sub_ref_path)),
+                        'file',
+                        self.content_store
+                    )
+
+
+def _compile_globs(patterns):
+    if not patterns:
+        return None
+
+    return re.compile('|'.join(fnmatch.translate(pattern) for pattern in patterns))
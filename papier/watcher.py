@@ -1,4 +1,6 @@
 import logging
+import os
+import threading
 import time
 
 from imagination.debug import get_logger
@@ -8,31 +10,100 @@ log = get_logger('watcher', level = logging.DEBUG)
 
 
 class FSEventHandler(FileSystemEventHandler):
+    """ Coalesce the file system events
+
+        The paths of the events are collected until no new event comes in for
+        ``delay`` seconds, then the callback receives the set of the changed
+        paths. The callbacks never run concurrently.
+
+        :param delay: the number of seconds to wait for the events to settle
+    """
+    event_types = ('created', 'deleted', 'modified', 'moved')
+
+    def __init__(self, delay = None):
+        self.delay    = delay or 0.1
+        self.callback = None
+
+        self._paths      = set()
+        self._timer      = None
+        self._lock       = threading.Lock()
+        self._flush_lock = threading.Lock()
+
     def on_any_event(self, event):
-        print(event)
+        if event.event_type not in self.event_types:
+            return
+
+        # The events of the children are enough to know what has changed.
+        if event.is_directory and event.event_type == 'modified':
+            return
+
+        paths = [
+            path
+            for path in (event.src_path, getattr(event, 'dest_path', None))
+            if path and not self._is_ignored(path)
+        ]
+
+        if not paths:
+            return
+
+        with self._lock:
+            self._paths.update(paths)
 
-    def on_created(self, event):
-        pass
+            if self._timer:
+                self._timer.cancel()
 
-    def on_deleted(self, event):
-        pass
+            self._timer = threading.Timer(self.delay, self._flush)
+            self._timer.daemon = True
+            self._timer.start()
 
-    def on_modified(self, event):
-        pass
+    def _flush(self):
+        with self._flush_lock:
+            with self._lock:
+                paths       = self._paths
+                self._paths = set()
+                self._timer = None
 
-    def on_moved(self, event):
-        pass
+            if paths and self.callback:
+                self.callback(paths)
+
+    def _is_ignored(self, path):
+        # Skip the hidden files (e.g. swap files) and the interpretation cache.
+        return (
+            os.path.basename(path).startswith('.')
+            or '{}.papier-cache{}'.format(os.sep, os.sep) in path
+        )
 
 
 class LiveUpdateService(object):
-    def __init__(self, observer, handler):
-        self.observer = observer
-        self.handler  = handler
+    def __init__(self, observer, handler, assembler):
+        self.observer  = observer
+        self.handler   = handler
+        self.assembler = assembler
+
+    def watch(self, config, callback = None):
+        """ Rebuild the affected pages whenever the source of the site changes
 
-    def watch(self, path):
+            :param callback: the callable receiving the changed paths instead
+                             of rebuilding the pages
+        """
+        path = os.path.abspath(config.source.path)
+
+        self.handler.callback = callback or (lambda src_paths: self.update(config, src_paths))
         self.observer.schedule(self.handler, path, recursive = True)
         log.debug('Will observe {}'.format(path))
 
+    def update(self, config, src_paths):
+        started_at = time.perf_counter()
+
+        try:
+            self.assembler.update(config, src_paths)
+        except Exception as e:
+            log.error('Failed to update: {}: {}'.format(type(e).__name__, e))
+
+            return
+
+        log.info('Updated {} path(s) in {:.3f}s'.format(len(src_paths), time.perf_counter() - started_at))
+
     def start(self):
         self.observer.start()
 
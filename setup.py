@@ -49,5 +49,10 @@ setup(
         'flask',
         'jinja2',
         'watchdog',
-    ]
+    ],
+    extras_require = {
+        'markdown'  : ['markdown'],  # markdown.engine: python
+        'highlight' : ['pygments'],  # highlight.enabled: true
+        'brotli'    : ['brotli'],    # output.compression: [brotli]
+    },
 )
@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from jinja2 import Environment, PackageLoader
+
+from papier.assembler   import Assembler, log
+from papier.assets      import AssetPipeline
+from papier.config      import BuildConfig, MainConfig, MarkdownConfig, OutputConfig, SearchConfig, SourceConfig
+from papier.config      import ThemeConfig
+from papier.content     import ContentStore
+from papier.doctree     import Factory
+from papier.interpreter import Interpreter
+from papier.md          import MarkDownHandler
+from papier.minify      import HTMLMinifier
+from papier.output      import OutputWriter
+from papier.rendering   import RenderingEngine
+from papier.rst         import RSTHandler
+from papier.search      import SearchIndexer
+from papier.walker      import FileWalker
+
+
+class AssemblerTest(unittest.TestCase):
+    def setUp(self):
+        self.base_path = tempfile.mkdtemp()
+        self.src_path  = os.path.join(self.base_path, 'src')
+        self.out_path  = os.path.join(self.base_path, 'build')
+
+        os.makedirs(self.src_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.base_path)
+
+    def test_same_page_from_two_sources(self):
+        # Written in the reverse order of their names on purpose.
+        self._write('a.rst', 'From reStructuredText\n=====================\n')
+        self._write('a.md', '# From Markdown\n')
+        self._write('index.md', '# Home\n')
+
+        for _ in range(2):  # the second build reads the manifest of the first one
+            with self.assertLogs(log, 'WARNING') as logs:
+                self._assemble()
+
+            self.assertIn('a.rst is ignored', logs.output[0])
+
+            with open(os.path.join(self.out_path, 'a.html')) as f:
+                self.assertIn('From Markdown', f.read())
+
+    def _write(self, name, content):
+        with open(os.path.join(self.src_path, name), 'w') as f:
+            f.write(content)
+
+    def _assemble(self):
+        output_writer = OutputWriter()
+        assembler     = Assembler(
+            None,
+            FileWalker(ContentStore()),
+            Interpreter([RSTHandler(), MarkDownHandler()]),
+            Factory(),
+            RenderingEngine(Environment(loader = PackageLoader('papier', 'template'))),
+            output_writer,
+            AssetPipeline(output_writer),
+            HTMLMinifier(),
+            SearchIndexer(output_writer),
+        )
+
+        assembler.assemble(MainConfig(
+            SourceConfig(self.src_path),
+            OutputConfig(self.out_path),
+            ThemeConfig(),
+            [],
+            MarkdownConfig('python'),
+            BuildConfig(1),
+            SearchConfig(True),
+        ))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+
+from papier.minify import HTMLMinifier
+
+
+class HTMLMinifierTest(unittest.TestCase):
+    def setUp(self):
+        self.minifier = HTMLMinifier(True)
+
+    def test_collapse_whitespace(self):
+        html = '<div>\n  <p>Hello,\n\t  world</p>\n</div>\n'
+
+        self.assertEqual('<div><p>Hello, world</p></div>', self.minifier.minify(html))
+        self.assertEqual(len(html) - len('<div><p>Hello, world</p></div>'), self.minifier.saved_bytes)
+
+    def test_keep_non_breaking_and_em_spaces(self):
+        html = '<p>10\u00a0km</p>\n<p>A\u2003B \u00a0 C</p>'
+
+        self.assertEqual('<p>10\u00a0km</p><p>A\u2003B \u00a0 C</p>', self.minifier.minify(html))
+        self.assertEqual(1, self.minifier.saved_bytes)
+
+    def test_count_saved_bytes(self):
+        html     = '<p>x \n  \u00a0\u2003  \n y</p>'
+        minified = self.minifier.minify(html)
+
+        self.assertEqual('<p>x \u00a0\u2003 y</p>', minified)
+        self.assertEqual(len(html.encode('utf-8')) - len(minified.encode('utf-8')), self.minifier.saved_bytes)
+
+    def test_keep_verbatim_elements(self):
+        html = '<p>a  <code>x  y</code></p><pre>  a\n\n  b  </pre>'
+
+        self.assertEqual(html.replace('a  <code>', 'a <code>'), self.minifier.minify(html))
+
+    def test_disabled(self):
+        html = '<p>  a  </p>'
+
+        self.assertEqual(html, HTMLMinifier().minify(html))
+
+
+if __name__ == '__main__':
+    unittest.main()